@@ -0,0 +1,70 @@
+import datetime
+import glob
+import hashlib
+import json
+import os
+import pickle
+import autots
+from forecasts import forecast_length
+
+# Fitted models kept for re-prediction, one per template and training dataset
+artifacts_dir = "models/artifacts"
+
+# Bump when the content of an artifact changes, older artifacts are then refitted
+ARTIFACT_VERSION = 1
+
+
+def file_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()[:12]
+
+
+def artifact_path(template_path, dataset_key):
+    # dataset_key comes from dataset.dataset_fingerprint: "<loader arguments>-<store files>"
+    template_name = os.path.splitext(os.path.basename(template_path))[0]
+    return os.path.join(artifacts_dir, f"{template_name}-{file_hash(template_path)}-{dataset_key}.pkl")
+
+
+def save_model(model, template_path, dataset_key):
+    path = artifact_path(template_path, dataset_key)
+    metadata = {
+        "version": ARTIFACT_VERSION,
+        "autots_version": autots.__version__,
+        "template": template_path,
+        "template_hash": file_hash(template_path),
+        "dataset": dataset_key,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+    # Artifacts for older data of the same template and dataset arguments are never loaded again
+    template_name = os.path.splitext(os.path.basename(template_path))[0]
+    params_key = dataset_key.split("-")[0]
+    for stale_path in glob.glob(os.path.join(artifacts_dir, f"{template_name}-*-{params_key}-*.pkl")):
+        os.remove(stale_path)
+        if os.path.exists(stale_path[:-4] + ".json"):
+            os.remove(stale_path[:-4] + ".json")
+
+    os.makedirs(artifacts_dir, exist_ok=True)
+    with open(path + ".tmp", "wb") as file:
+        pickle.dump({"metadata": metadata, "model": model}, file)
+    os.replace(path + ".tmp", path)
+    with open(path[:-4] + ".json", "w") as file:
+        json.dump(metadata, file, indent=4)
+    return path
+
+
+def load_model(template_path, dataset_key):
+    # The fitted model for this template and dataset, or None when it has to be refitted
+    path = artifact_path(template_path, dataset_key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        artifact = pickle.load(file)
+
+    metadata = artifact["metadata"]
+    if metadata["version"] != ARTIFACT_VERSION or metadata["autots_version"] != autots.__version__:
+        return None
+    # Fitted for other horizons than forecasts.horizons asks for now
+    if artifact["model"].forecast_length != forecast_length():
+        return None
+    return artifact["model"]
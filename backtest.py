@@ -0,0 +1,142 @@
+import sys
+import datetime
+import numpy as np
+import pandas as pd
+from baseline import forecast_matrix
+from dataset import load_panel, end_date
+from panel import ScorePanel
+
+league = "ligue-1-fr"
+
+# Series with fewer scores than this are not loaded
+min_rows = 20
+
+# Number of past gameweeks replayed per player: origin k forecasts each player's k-th latest
+# score from the scores before it
+origins = 24
+
+# A player is only scored at an origin when it has at least this many scores before it
+min_history = 10
+
+# Expected scores are grouped in classes of this width for the per-class metrics
+class_width = 10
+
+
+def baseline_forecaster(series_ids, history):
+    return forecast_matrix(history)
+
+
+def template_forecaster(template_path, n_jobs="auto"):
+    # Refits an AutoTS template at every origin; far slower than the baseline but gives
+    # comparable numbers for models/*_model.csv before one goes to production
+    from autots import AutoTS
+
+    def forecaster(series_ids, history):
+        history_df = ScorePanel(series_ids, history, None, end_date).to_wide()
+
+        model = AutoTS(
+            forecast_length=1,
+            frequency="D",
+            ensemble="all",
+            max_generations=0,
+            num_validations=0,
+            no_negatives=True,
+            verbose=0,
+            constraint=2.0,
+            introduce_na=False,
+            n_jobs=n_jobs,
+        )
+        model = model.import_template(template_path, method="only", enforce_model_list=True)
+        model = model.fit(history_df)
+        prediction = model.predict()
+
+        # AutoTS may drop or reorder series, the missing ones are not scored
+        return tuple(
+            frame.iloc[0].reindex(series_ids).to_numpy(np.float32)
+            for frame in (prediction.forecast, prediction.lower_forecast, prediction.upper_forecast)
+        )
+
+    return forecaster
+
+
+def run_backtest(panel, forecaster=baseline_forecaster):
+    # (series ids, actual, forecast, lower, upper): arrays of shape (origins, series),
+    # NaN where a player has no score at that origin or too little history before it
+    series_ids, matrix, count = panel.slugs, np.asarray(panel.values), panel.lengths
+    n_origins = min(origins, matrix.shape[1] - 1)
+
+    shape = (n_origins, len(series_ids))
+    actual = np.full(shape, np.nan, dtype=np.float32)
+    forecast, lower, upper = np.full(shape, np.nan, dtype=np.float32), np.full(shape, np.nan, dtype=np.float32), np.full(shape, np.nan, dtype=np.float32)
+
+    for k in range(1, n_origins + 1):
+        # Right-aligned rows: dropping the last k columns removes every player's k latest scores
+        active = count - k >= min_history
+        if not active.any():
+            break
+        history = matrix[active, :-k]
+        history = history[:, ~np.isnan(history).all(axis=0)]
+        forecast[k - 1, active], lower[k - 1, active], upper[k - 1, active] = forecaster(series_ids[active], history)
+        actual[k - 1, active] = matrix[active, -k]
+
+    return series_ids, actual, forecast, lower, upper
+
+
+def score_backtest(actual, forecast, lower, upper):
+    # Whole-array metrics over every scored (origin, player) pair
+    scored = ~np.isnan(actual) & ~np.isnan(forecast)
+    actual, forecast = actual[scored], forecast[scored]
+    lower, upper = lower[scored], upper[scored]
+
+    deviation = np.abs(forecast - actual)
+    denominator = (np.abs(actual) + np.abs(forecast)) / 2
+    smape = 100 * np.divide(deviation, denominator, out=np.zeros_like(deviation), where=denominator > 0)
+    within = (lower <= actual) & (actual <= upper)
+
+    classes = np.clip(forecast // class_width, 0, 100 // class_width - 1).astype(int)
+    n_classes = 100 // class_width
+    class_count = np.bincount(classes, minlength=n_classes)
+    with np.errstate(invalid="ignore"):
+        by_class = pd.DataFrame(
+            {
+                "Count": class_count,
+                "SMAPE": np.bincount(classes, weights=smape, minlength=n_classes) / class_count,
+                "Deviation": np.bincount(classes, weights=deviation, minlength=n_classes) / class_count,
+            },
+            index=[f"{i}-{i + class_width}" for i in range(0, 100, class_width)],
+        )
+
+    summary = {
+        "Forecasts": int(scored.sum()),
+        "SMAPE": float(smape.mean()),
+        "Deviation": float(deviation.mean()),
+        "Bias": float((forecast - actual).mean()),
+        "Within Bounds": float(within.mean() * 100),
+        "Bound Width": float((upper - lower).mean()),
+    }
+    return summary, by_class
+
+
+def compare(panel, forecasters):
+    # {name: forecaster} -> one row of summary metrics per forecaster
+    rows = {}
+    for name, forecaster in forecasters.items():
+        start_time = datetime.datetime.now()
+        summary, by_class = score_backtest(*run_backtest(panel, forecaster)[1:])
+        summary["Seconds"] = (datetime.datetime.now() - start_time).total_seconds()
+        rows[name] = summary
+        print(f"{name}:")
+        print(by_class)
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+if __name__ == "__main__":
+    # python backtest.py [league] [template.csv ...] compares the baseline with each template
+    if len(sys.argv) > 1:
+        league = sys.argv[1]
+    forecasters = {"baseline": baseline_forecaster}
+    for template_path in sys.argv[2:]:
+        forecasters[template_path] = template_forecaster(template_path)
+
+    panel = load_panel(league, min_rows=min_rows)
+    print(compare(panel, forecasters).round(2).to_string())
@@ -0,0 +1,85 @@
+import sys
+import datetime
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from dataset import load_panel
+from forecasts import save_forecasts, forecast_length
+from panel import ScorePanel
+
+# Weight of the newest score in the exponentially weighted mean
+alpha = 0.2
+
+# Number of most recent scores averaged in the last-N mean
+last_n = 5
+
+# Share of the exponentially weighted mean in the forecast, the rest is the last-N mean
+ewm_share = 0.5
+
+# Bounds are empirical quantiles of each player's last `window` scores
+window = 20
+lower_quantile = 0.1
+upper_quantile = 0.9
+
+
+def row_quantile(matrix, quantile):
+    # np.nanquantile(matrix, quantile, axis=1) with linear interpolation, without its per-row loop:
+    # NaNs sort last, so each row's valid scores are its first `count` sorted values
+    ordered = np.sort(matrix, axis=1)
+    count = (~np.isnan(matrix)).sum(axis=1)
+    position = (count - 1) * quantile
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, count - 1)
+    rows = np.arange(len(matrix))
+    fraction = position - below
+    return ordered[rows, below] * (1 - fraction) + ordered[rows, above] * fraction
+
+
+def forecast_matrix(matrix):
+    # Expected, lower and upper next score of every row of a panel's matrix, all rows at once
+    valid = ~np.isnan(matrix)
+    filled = np.where(valid, matrix, 0)
+
+    age = np.arange(matrix.shape[1] - 1, -1, -1)
+    weights = (1 - alpha) ** age * valid
+    ewm = (filled * weights).sum(axis=1) / weights.sum(axis=1)
+
+    last_mean = filled[:, -last_n:].sum(axis=1) / valid[:, -last_n:].sum(axis=1)
+    forecast = ewm_share * ewm + (1 - ewm_share) * last_mean
+
+    recent = matrix[:, -window:]
+    lower = np.minimum(row_quantile(recent, lower_quantile), forecast)
+    upper = np.maximum(row_quantile(recent, upper_quantile), forecast)
+    return forecast, lower, upper
+
+
+def predict(final_df):
+    return predict_panel(ScorePanel.from_long(final_df))
+
+
+def predict_panel(panel):
+    # Same shape as an AutoTS prediction: forecast, upper_forecast and lower_forecast frames
+    # with one row per step ahead and one column per series. The baseline has no trend, every
+    # step gets the same forecast.
+    forecast, lower, upper = forecast_matrix(np.asarray(panel.values))
+
+    dates = pd.date_range(panel.end_date + pd.Timedelta(days=1), periods=forecast_length(), freq="D")
+    columns = pd.Index(panel.slugs, name="series_id")
+    return SimpleNamespace(
+        template="baseline",
+        forecast=pd.DataFrame(np.tile(forecast, (len(dates), 1)), index=dates, columns=columns),
+        upper_forecast=pd.DataFrame(np.tile(upper, (len(dates), 1)), index=dates, columns=columns),
+        lower_forecast=pd.DataFrame(np.tile(lower, (len(dates), 1)), index=dates, columns=columns),
+    )
+
+
+if __name__ == "__main__":
+    # python baseline.py [league ...] writes <league>_baseline_forecasts*.csv for each league,
+    # or global_baseline_forecasts*.csv for every league together, and adds the run to the
+    # history under the same name, apart from the league's model forecasts
+    for league in sys.argv[1:] or [None]:
+        start_time = datetime.datetime.now()
+        panel = load_panel(league, min_rows=20 if league else 40)
+        save_forecasts(predict_panel(panel), f"{league or 'global'}_baseline")
+        duration = datetime.datetime.now() - start_time
+        print(f"Time elapsed: {duration.total_seconds():.2f} seconds")
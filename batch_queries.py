@@ -0,0 +1,104 @@
+from collections import deque
+from gql.transport.exceptions import TransportQueryError
+from response_cache import CacheMiss
+from score_sync import format_datetime, is_newer
+from sorare_client import player_scores_batch, club_players_batch
+
+# Number of players (or clubs) packed into one GraphQL request with field aliases
+batch_size = 20
+
+
+def failed_aliases(error, data):
+    # gql raises TransportQueryError as soon as a response has errors, with whatever data came
+    # back attached: the aliases that are null or named in an error's path failed, the others
+    # answered normally
+    failed = {alias for alias, value in data["football"].items() if value is None}
+    for entry in error.errors or []:
+        failed.update(key for key in entry.get("path") or [] if key in data["football"])
+    return failed
+
+
+async def execute_batch(execute, document, variables, queries):
+    # (data, failed aliases) of an aliased request. Raises when nothing usable came back.
+    try:
+        return await execute(document, variables, queries=queries), set()
+    except TransportQueryError as error:
+        if not error.data or not error.data.get("football"):
+            raise
+        return error.data, failed_aliases(error, error.data)
+
+
+async def fetch_scores_batched(execute, slugs, since=None, size=None):
+    # Async generator yielding (slug, scores) as soon as each player's history is complete.
+    # Scores keep the API order (newest first). A window of `size` players is packed into
+    # every request, each alias with its own cursor; finished players leave the window and
+    # the next slugs take their place, so every request stays full until the end.
+    # `since` optionally maps slugs to watermarks: paging stops once saved scores are reached.
+    # When a request still fails after the client's retries, its players are yielded with
+    # None instead of scores and the others carry on; when only some aliases fail, only those
+    # players are.
+    since = since or {}
+    size = size or batch_size
+    pending = deque(slugs)
+    active = {}
+
+    while pending or active:
+        while pending and len(active) < size:
+            active[pending.popleft()] = {"after": None, "scores": []}
+
+        window = list(active)
+        variables = {}
+        for i, slug in enumerate(window):
+            variables[f"slug{i}"] = slug
+            variables[f"after{i}"] = active[slug]["after"]
+        try:
+            data, failed = await execute_batch(execute, player_scores_batch(len(window)), variables, len(window))
+        except CacheMiss:
+            # Offline runs stop at the first request that is not cached, nothing is given up
+            raise
+        except Exception as error:
+            print(f"Giving up on {len(window)} players for this run: {error!r}")
+            for slug in window:
+                del active[slug]
+                yield slug, None
+            continue
+
+        for i, slug in enumerate(window):
+            state = active[slug]
+            if f"p{i}" in failed:
+                print(f"Giving up on {slug} for this run")
+                del active[slug]
+                yield slug, None
+                continue
+            player = data["football"][f"p{i}"]
+
+            scores_data = player["allSo5Scores"]
+            nodes = scores_data["nodes"]
+            new_nodes = [
+                node for node in nodes
+                if is_newer(format_datetime(node["game"]["date"]), since.get(slug))
+            ]
+            state["scores"].extend(new_nodes)
+
+            if len(new_nodes) < len(nodes) or not scores_data["pageInfo"]["hasNextPage"]:
+                del active[slug]
+                yield slug, state["scores"]
+            else:
+                state["after"] = scores_data["pageInfo"]["endCursor"]
+
+
+async def fetch_clubs_batched(execute, slugs, size=None):
+    # Returns {club slug: response}, each response shaped like a single club(slug: ...) query.
+    # Clubs whose alias failed get a null club, like an unknown slug.
+    size = size or batch_size
+    slugs = list(slugs)
+    clubs = {}
+    for start in range(0, len(slugs), size):
+        chunk = slugs[start:start + size]
+        variables = {f"slug{i}": slug for i, slug in enumerate(chunk)}
+        data, failed = await execute_batch(execute, club_players_batch(len(chunk)), variables, len(chunk))
+        for i, slug in enumerate(chunk):
+            if f"c{i}" in failed:
+                print(f"Giving up on club {slug} for this run")
+            clubs[slug] = {"football": {"club": None if f"c{i}" in failed else data["football"][f"c{i}"]}}
+    return clubs
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+repo_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_folder)
+sys.path.insert(0, os.path.join(repo_folder, "benchmarks"))
+
+import baseline
+import instrumentation
+import sorare_client
+import stand_in_server
+import synthetic
+import train_league
+import pandas as pd
+from aiohttp import web
+from instrumentation import stage
+from batch_queries import fetch_clubs_batched, fetch_scores_batched
+from dataset import load_training_frame, load_panel
+from forecasts import save_forecasts
+from rosters import load_club_files
+from score_store import compact, migrate_csv_tree, write_scores
+from score_sync import format_datetime
+from sorare_client import SorareClient
+
+# Synthetic tree: leagues x players per league x games per player
+leagues = 2
+players = 200
+games = 60
+
+# Local stand-in answering the downloads, with a simulated server time per request
+api_port = 8766
+api_latency = 0.05
+api_latency_per_alias = 0.005
+
+# Players buffered before a part is written to the score store, as in dl_so5.py
+flush_every = 200
+
+# Reduced template search: one generation, one validation, AutoTS's fastest models
+generations = 1
+validations = 1
+model_list = "superfast"
+
+
+async def download(league):
+    # Same requests and writes as dl_so5.py: the league's clubs in aliased batches, then every
+    # player's full score history, paged 50 scores at a time, into the league's partition of
+    # the score store, compacted at the end
+    with open(os.path.join("data", f"{league}.json")) as file:
+        club_slugs = [club["slug"] for club in json.load(file)["data"]["football"]["competition"]["clubs"]["nodes"]]
+
+    # Rosters of the generated league, the last club can be partial
+    stand_in_server.club_sizes = {
+        slug: len(club["football"]["club"]["activePlayers"]["nodes"]) for slug, club in load_club_files(league).items()
+    }
+    stand_in_server.scores_per_player = games
+    stand_in_server.latency = api_latency
+    stand_in_server.latency_per_alias = api_latency_per_alias
+    runner = web.AppRunner(stand_in_server.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", api_port).start()
+    sorare_client.url = f"http://127.0.0.1:{api_port}/graphql"
+
+    try:
+        start_time = time.perf_counter()
+        async with SorareClient(cache=False) as client:
+            clubs = await fetch_clubs_batched(client.execute, club_slugs)
+            slugs = [
+                player["slug"]
+                for club_data in clubs.values()
+                if club_data["football"]["club"]
+                for player in club_data["football"]["club"]["activePlayers"]["nodes"]
+            ]
+            rows, downloaded, n_scores = [], 0, 0
+            async for slug, score_data in fetch_scores_batched(client.execute, slugs):
+                if not score_data:
+                    continue
+                rows.extend({"slug": slug, "datetime": format_datetime(item["game"]["date"]), "score": item["score"]} for item in score_data)
+                downloaded += 1
+                n_scores += len(score_data)
+                if downloaded % flush_every == 0:
+                    write_scores(league, pd.DataFrame(rows))
+                    rows.clear()
+            stats = dict(client.stats)
+        if rows:
+            write_scores(league, pd.DataFrame(rows))
+        compact(league)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        await runner.cleanup()
+
+    return {
+        "players": downloaded,
+        "scores": n_scores,
+        "requests": stats["requests"],
+        "seconds": round(elapsed, 3),
+        "players_per_second": round(downloaded / elapsed, 1),
+        "requests_per_second": round(stats["requests"] / elapsed, 1),
+        "kb_received": round(stats["bytes_received"] / 1024, 1),
+    }
+
+
+def timed(function, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, round(time.perf_counter() - start_time, 3)
+
+
+def run_benchmarks():
+    results = {}
+    league_names = [f"league-{l}" for l in range(leagues)]
+
+    with stage("generate"):
+        synthetic.generate(leagues, players, games)
+
+    with stage("download"):
+        results["download"] = asyncio.run(download(league_names[0]))
+
+    with stage("dataset"):
+        with stage("migrate"):
+            migrate_csv_tree()
+        _, results["training_frame_seconds"] = timed(load_training_frame, league_names)
+        _, results["training_frame_cached_seconds"] = timed(load_training_frame, league_names)
+        panel, results["panel_seconds"] = timed(load_panel, league_names)
+        _, results["panel_cached_seconds"] = timed(load_panel, league_names)
+        results["series"] = len(panel)
+
+    with stage("train"):
+        train_league.generations = generations
+        train_league.validations = validations
+        train_league.model_list = model_list
+        train_league.warm_start = False
+        train_league.fallback_to_baseline = False
+        _, results["train_seconds"] = timed(train_league.train, league_names[0])
+
+    with stage("export"):
+        prediction = baseline.predict_panel(panel)
+        _, results["export_seconds"] = timed(save_forecasts, prediction, "benchmark")
+
+    return results
+
+
+if __name__ == "__main__":
+    # python benchmarks/run.py [leagues [players [games]]]
+    # Runs in a temporary folder; the run and its stages are appended to logs/runs.jsonl here
+    sizes = [int(value) for value in sys.argv[1:4]]
+    leagues, players, games = sizes + [leagues, players, games][len(sizes):]
+
+    instrumentation.run_log = os.path.abspath(instrumentation.run_log)
+    with tempfile.TemporaryDirectory(prefix="sorare-benchmark-") as work_folder:
+        os.chdir(work_folder)
+        with instrumentation.run("benchmark", leagues=leagues, players=players, games=games) as record:
+            record["results"] = run_benchmarks()
+        os.chdir(repo_folder)
+
+    print(json.dumps(record["results"], indent=4))
+    print(instrumentation.load_runs("benchmark").query(f"started == '{record['started']}'")[["name", "wall", "cpu", "peak_rss_mb"]].to_string(index=False))
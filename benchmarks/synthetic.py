@@ -0,0 +1,70 @@
+import datetime
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rosters import data_main_folder, positions, save_roster
+
+# Synthetic data tree in the layout the downloaders produce (dl_so5.py with score_format = "csv"),
+# written under ./data/ of the working directory:
+#
+#     data/<league>.json                 competition with its clubs
+#     data/<league>/clubs/<club>.json    club roster with the last 15 scores of every player
+#     data/<league>/<slug>.csv           datetime,score of every game, oldest first
+#     data/<league>/roster.parquet       roster index
+#
+# Every player has `games` weekly games ending on last_game. Scores are drawn around a
+# per-player level, with about one game in six a zero (did not play). Same seed, same data.
+last_game = datetime.datetime(2024, 2, 18, 20, 0)
+players_per_club = 25
+zero_share = 0.15
+seed = 0
+
+
+def generate(leagues=2, players=500, games=100):
+    rng = np.random.default_rng(seed)
+    dates = [
+        (last_game - datetime.timedelta(weeks=games - 1 - i)).strftime("%Y-%m-%d %H:%M:%S")
+        for i in range(games)
+    ]
+    for l in range(leagues):
+        league = f"league-{l}"
+        league_folder = os.path.join(data_main_folder, league)
+        os.makedirs(os.path.join(league_folder, "clubs"), exist_ok=True)
+
+        # Scores of the whole league at once: one row per player, oldest game first
+        level = rng.uniform(20, 60, (players, 1))
+        scores = np.clip(rng.normal(level, 15, (players, games)), 0, 100).round(1)
+        scores[rng.random((players, games)) < zero_share] = 0
+
+        clubs = {}
+        for p in range(players):
+            club = f"{league}-club-{p // players_per_club}"
+            slug = f"{club}-player-{p % players_per_club}"
+            pd.DataFrame({"datetime": dates, "score": scores[p]}).to_csv(os.path.join(league_folder, f"{slug}.csv"), index=False)
+
+            nodes = clubs.setdefault(club, {"football": {"club": {"activePlayers": {"nodes": []}}}})["football"]["club"]["activePlayers"]["nodes"]
+            nodes.append({
+                "slug": slug,
+                "displayName": slug.replace("-", " ").title(),
+                "position": positions[p % len(positions)],
+                "so5Scores": [{"score": float(score)} for score in scores[p, ::-1][:15]],
+            })
+
+        for club, club_data in clubs.items():
+            with open(os.path.join(league_folder, "clubs", f"{club}.json"), "w") as file:
+                json.dump(club_data, file)
+        with open(os.path.join(data_main_folder, f"{league}.json"), "w") as file:
+            json.dump({"data": {"football": {"competition": {"clubs": {"nodes": [{"slug": club} for club in clubs]}}}}}, file)
+        save_roster(league, clubs)
+
+
+if __name__ == "__main__":
+    # python benchmarks/synthetic.py [leagues [players [games]]], from the folder to fill
+    sizes = [int(value) for value in sys.argv[1:4]]
+    leagues, players, games = sizes + [2, 500, 100][len(sizes):]
+    generate(leagues, players, games)
+    print(f"{leagues} leagues x {players} players x {games} games written to {data_main_folder}")
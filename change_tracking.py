@@ -0,0 +1,59 @@
+import hashlib
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from forecast_history import load_history, run_ids, template_id
+
+# Forecast runs of a league searched for forecasts that are still current
+lookback_runs = 20
+
+
+def series_hashes(panel):
+    # Content hash of every series of a ScorePanel (its float32 scores), indexed by slug.
+    # A player whose hash is unchanged since the last run has no new score.
+    width = panel.values.shape[1]
+    return pd.Series(
+        [
+            hashlib.blake2b(np.asarray(panel.values[i, width - length:]).tobytes(), digest_size=8).hexdigest()
+            for i, length in enumerate(panel.lengths)
+        ],
+        index=pd.Index(panel.slugs, name="slug"),
+        dtype=object,
+    )
+
+
+def reusable_forecasts(league, hashes, template_path, steps):
+    # Newest forecast of every player and step made with the same template file over the
+    # league's recent runs, kept when it was made from the same scores as now and has every
+    # step asked for. Runs of other templates or without hashes (predict.py, baseline
+    # fallbacks) are skipped, not a reason to start over. Everything else is re-forecast.
+    history = load_history(league, runs=run_ids(league)[-lookback_runs:])
+    history = history[history["series_hash"].notna() & (history["template"] == template_id(template_path))]
+    # The history is sorted oldest run first
+    newest = history[history["step"].isin(steps)].drop_duplicates(["slug", "step"], keep="last")
+    newest = newest[newest["series_hash"] == hashes.reindex(newest["slug"]).to_numpy()]
+    return newest[newest.groupby("slug")["step"].transform("nunique") == len(set(steps))]
+
+
+def merge_predictions(prediction, reused, template_path, next_date, length):
+    # New forecasts of the changed series (None when nothing changed) plus the reused rows, in
+    # the shape of an AutoTS prediction (`length` rows from next_date, one column per player)
+    # with the template of every player. Steps that were not stored are left empty.
+    if prediction is None:
+        index = pd.date_range(next_date, periods=length, freq="D")
+        frames = {name: pd.DataFrame(index=index) for name in ["forecast", "lower_forecast", "upper_forecast"]}
+        template = pd.Series(dtype=object)
+    else:
+        index = prediction.forecast.index
+        frames = {name: getattr(prediction, name) for name in ["forecast", "lower_forecast", "upper_forecast"]}
+        template = getattr(prediction, "template", None)
+        if not isinstance(template, pd.Series):
+            template = pd.Series(template or template_path, index=frames["forecast"].columns, dtype=object)
+
+    merged = {}
+    for name, column in [("forecast", "expected"), ("lower_forecast", "lower"), ("upper_forecast", "upper")]:
+        stored = reused.pivot(index="step", columns="slug", values=column).reindex(range(1, len(index) + 1))
+        stored = stored.set_axis(index).rename_axis(columns="series_id")
+        merged[name] = pd.concat([frames[name], stored], axis=1).sort_index(axis=1)
+    reused_template = reused.drop_duplicates("slug").set_index("slug")["template"]
+    return SimpleNamespace(template=pd.concat([template, reused_template]), **merged)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import glob
+import shutil
+import pandas as pd
+from instrumentation import stage
+from panel import ScorePanel
+from score_store import load_scores, part_files
+
+# Every series ends on this date, one synthetic day per game going backwards
+end_date = "2024-02-19"
+
+# Training frames already built, keyed on the loader arguments and the store files they came from
+cache_dir = "data/cache"
+
+
+def _params_key(leagues, slugs, min_rows):
+    params = {
+        "leagues": sorted(leagues) if leagues else None,
+        "slugs": sorted(slugs) if slugs else None,
+        "min_rows": min_rows,
+        "end_date": end_date,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _files_key(leagues):
+    # Path, size and modification time of every store file; any download or compaction changes it
+    fingerprint = [(path, os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in part_files(leagues)]
+    return hashlib.sha256(json.dumps(fingerprint).encode()).hexdigest()[:12]
+
+
+def dataset_fingerprint(leagues=None, slugs=None, min_rows=20):
+    # Identifies a training frame without loading it
+    if isinstance(leagues, str):
+        leagues = [leagues]
+    return f"{_params_key(leagues, slugs, min_rows)}-{_files_key(leagues)}"
+
+
+def build_training_frame(scores, min_rows=20):
+    # scores as returned by score_store.load_scores (sorted by league, slug and date).
+    # Zero scores are dropped, series with fewer than min_rows scores left are skipped, and a
+    # player found in several leagues is taken from the first league (alphabetically) where it
+    # has enough scores. Each series is then re-dated one day per game, ending on end_date.
+    scores = scores[scores["score"] != 0]
+
+    counts = scores.groupby(["league", "slug"], observed=True, sort=False)["score"].transform("size")
+    scores = scores[counts >= min_rows]
+
+    league_codes = pd.Series(scores["league"].cat.codes.values, index=scores.index)
+    first_league = league_codes.groupby(scores["slug"], sort=False).transform("first")
+    scores = scores[league_codes == first_league]
+
+    by_series = scores.groupby("slug", sort=False)
+    days_before_end = by_series["score"].transform("size") - 1 - by_series.cumcount()
+
+    return pd.DataFrame(
+        {
+            "datetime": pd.Timestamp(end_date) - pd.to_timedelta(days_before_end.values, unit="D"),
+            "value": scores["score"].values,
+            "series_id": scores["slug"].values,
+        }
+    )
+
+
+def load_training_frame(leagues=None, slugs=None, min_rows=20, use_cache=True):
+    # Long frame (datetime, value, series_id) ready for AutoTS.fit
+    if isinstance(leagues, str):
+        leagues = [leagues]
+    params_key = _params_key(leagues, slugs, min_rows)
+    cache_path = os.path.join(cache_dir, f"training-{params_key}-{_files_key(leagues)}.parquet")
+    if use_cache and os.path.exists(cache_path):
+        with stage("load"):
+            return pd.read_parquet(cache_path)
+
+    with stage("load"):
+        scores = load_scores(leagues)
+    with stage("filter"):
+        if slugs is not None:
+            scores = scores[scores["slug"].isin(slugs)]
+        frame = build_training_frame(scores, min_rows)
+
+    if use_cache:
+        # Frames built from older versions of the store are never read again
+        for stale_path in glob.glob(os.path.join(cache_dir, f"training-{params_key}-*.parquet")):
+            os.remove(stale_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        frame.to_parquet(cache_path + ".tmp", index=False)
+        os.replace(cache_path + ".tmp", cache_path)
+    return frame
+
+
+def load_panel(leagues=None, slugs=None, min_rows=20, use_cache=True):
+    # The series of load_training_frame as a ScorePanel. The cached copy is memory-mapped,
+    # so a panel of every league only costs the rows actually read.
+    if isinstance(leagues, str):
+        leagues = [leagues]
+    params_key = _params_key(leagues, slugs, min_rows)
+    folder = os.path.join(cache_dir, f"panel-{params_key}-{_files_key(leagues)}")
+    if use_cache and os.path.exists(folder):
+        with stage("load"):
+            return ScorePanel.load(folder)
+
+    panel = ScorePanel.from_long(load_training_frame(leagues, slugs, min_rows, use_cache=False))
+    if not use_cache:
+        return panel
+
+    for stale_folder in glob.glob(os.path.join(cache_dir, f"panel-{params_key}-*")):
+        shutil.rmtree(stale_folder)
+    panel.save(folder + ".tmp")
+    os.replace(folder + ".tmp", folder)
+    return ScorePanel.load(folder)
@@ -1,128 +1,113 @@
-import json
 import os
-from datetime import datetime, timedelta
-from gql import Client, gql
-from gql.transport.aiohttp import AIOHTTPTransport
 import csv
 import asyncio
-import os
-from dotenv import load_dotenv
 import pandas as pd
+from sorare_client import SorareClient, USER_CARDS
+from score_sync import load_watermarks, save_watermarks, get_watermark, append_scores, format_datetime
+from batch_queries import fetch_scores_batched
+from score_store import write_scores
+from rosters import save_roster, save_cards
+from forecasts import forecast_length
+import instrumentation
+from instrumentation import stage
 
 userslug = "bananederungis"
 
-# GraphQL endpoint
-url = "https://api.sorare.com/federation/graphql"
-
 # Directory to save the data
 data_dir = "data/" + userslug
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
 
-
-load_dotenv()
-
-transport = AIOHTTPTransport(
-    url="https://api.sorare.com/federation/graphql",
-    headers={
-       'APIKEY': os.getenv('SORARE_API_KEY')
-    },
-)
-
-async def fetch_player_scores(slug):
-    all_scores = []
-    async with Client(transport=transport) as session:
-        query_template = """
-            {{
-            football {{
-                player(slug: "{slug}") {{
-                    allSo5Scores(after: "{after}", first: 50) {{
-                        pageInfo {{
-                        hasNextPage
-                        endCursor
-                        }}
-                        nodes {{
-                        score
-                        game {{
-                            date
-                        }}
-                        }}
-                    }}
-                }}
-            }}
-            }}
-            """
-        after_cursor = ""  # Start with no cursor
-        has_next_page = True
-
-        while has_next_page:
-            query = query_template.format(slug=slug, after=after_cursor)
-            data = await session.execute(gql(query))
-            scores_data = data["football"]["player"]["allSo5Scores"]
-            nodes = scores_data["nodes"]
-            all_scores.extend(nodes)
-
-            has_next_page = scores_data["pageInfo"]["hasNextPage"]
-            if has_next_page:
-                after_cursor = scores_data["pageInfo"]["endCursor"]
-
-        # Sort scores by game date from oldest to newest
-        all_scores.sort(key=lambda x: x["game"]["date"])
-        return all_scores
-
-async def fetch_my_players(userslug, transport, limit=50):
-    async with Client(transport=transport) as session:
-        all_players = []
-        has_next_page = True
-        end_cursor = None
-        
-        while has_next_page:
-            query_template = """
-            {{
-                user(slug: "{user_slug}") {{
-                    footballCards(first: {limit}, after: "{after_cursor}") {{
-                        nodes {{
-                            player {{
-                                slug
-                                displayName
-                                position
-                                so5Scores(last:15) {{
-                                    score
-                                }}
-                            }}
-                        }}
-                        pageInfo {{
-                            endCursor
-                            hasNextPage
-                        }}
-                    }}
-                }}
-            }}
-            """
-
-            query = query_template.format(user_slug=userslug, limit=limit, after_cursor=end_cursor or "")
-            data = await session.execute(gql(query))
-
-            # Append the current page of players to all_players
-            football_cards = data['user']['footballCards']
-            all_players.extend(football_cards['nodes'])
-
-            # Update pagination variables
-            page_info = football_cards['pageInfo']
-            has_next_page = page_info['hasNextPage']
-            end_cursor = page_info['endCursor']
-
-        return all_players
-
-def format_datetime(date_str):
-    # Parse the datetime string to a datetime object
-    dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
-    # Format the datetime object to the desired string format
-    return dt.strftime("%Y-%m-%d %H:%M:%S")
+# Raw score history with the real game dates, kept in sync incrementally
+history_dir = data_dir + "/history"
+os.makedirs(history_dir, exist_ok=True)
+
+# Only fetch scores newer than the saved history instead of each player's whole history
+incremental = True
+
+# Empty future rows after each player's last games in predictions.csv, more when the trainers
+# forecast more steps ahead (forecasts.horizons)
+future_rows = 2
+
+
+async def fetch_my_players(client, userslug, limit=50):
+    all_players = []
+    has_next_page = True
+    end_cursor = None
+
+    while has_next_page:
+        data = await client.execute(
+            USER_CARDS, {"slug": userslug, "first": limit, "after": end_cursor}
+        )
+
+        # Append the current page of players to all_players
+        football_cards = data['user']['footballCards']
+        all_players.extend(football_cards['nodes'])
+
+        # Update pagination variables
+        page_info = football_cards['pageInfo']
+        has_next_page = page_info['hasNextPage']
+        end_cursor = page_info['endCursor']
+
+    return all_players
+
+def save_player_history(slug, new_scores, watermarks):
+    # Append the new scores (newest first from the API) to the real-dated history
+    rows = [
+        {"datetime": format_datetime(item["game"]["date"]), "score": item["score"]}
+        for item in reversed(new_scores)
+    ]
+    if rows:
+        append_scores(f"{history_dir}/{slug}.csv", rows)
+        watermarks[slug] = rows[-1]["datetime"]
+
+def load_player_history(slug):
+    history_path = f"{history_dir}/{slug}.csv"
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, "r", newline="") as csvfile:
+        return [
+            {"datetime": row["datetime"], "score": float(row["score"])}
+            for row in csv.DictReader(csvfile)
+        ]
 
 async def main():
-    club_data = await fetch_my_players(userslug, transport)
-    
+    watermarks = load_watermarks(history_dir)
+
+    with stage("fetch"):
+        async with SorareClient() as client:
+            club_data = await fetch_my_players(client, userslug)
+
+            # Several cards can share a player, each player is only fetched once
+            slugs = list(dict.fromkeys(player["player"]["slug"] for player in club_data))
+            since = {}
+            for slug in slugs:
+                history_path = f"{history_dir}/{slug}.csv"
+                if incremental:
+                    since[slug] = get_watermark(watermarks, slug, history_path)
+                elif os.path.exists(history_path):
+                    os.remove(history_path)
+
+            # Histories of all cards are paged together, many players per request
+            async for slug, new_scores in fetch_scores_batched(client.execute, slugs, since):
+                # None when the player could not be fetched, its history is completed next run
+                if new_scores is not None:
+                    save_player_history(slug, new_scores, watermarks)
+
+    # The gallery is its own partition of the score store, rewritten with the full histories.
+    # Its roster index (the user standing in for the club) and card counts feed lineup.py.
+    with stage("export"):
+        players = {card["player"]["slug"]: card["player"] for card in club_data}
+        save_roster(userslug, {userslug: {"football": {"club": {"activePlayers": {"nodes": list(players.values())}}}}})
+        save_cards(userslug, club_data)
+        histories = [
+            pd.DataFrame(load_player_history(slug)).assign(slug=slug)
+            for slug in slugs
+            if os.path.exists(f"{history_dir}/{slug}.csv")
+        ]
+        if histories:
+            write_scores(userslug, pd.concat(histories, ignore_index=True), replace=True)
+
     end_date = pd.to_datetime("2024-02-19")
 
     with open(f"predictions.csv", "w", newline="") as prediction_csvfile:
@@ -130,9 +115,8 @@ async def main():
         prediction_writer = csv.DictWriter(prediction_csvfile, fieldnames=fieldnames)
         prediction_writer.writeheader()
         
-        for player in club_data:
-            slug = player["player"]["slug"]
-            score_data = await fetch_player_scores(slug)
+        for slug in slugs:
+            score_data = load_player_history(slug)
             
             if score_data:
                 print(f"Saving data for {slug}")
@@ -159,12 +143,14 @@ async def main():
                 for date, game in zip(last_5_games_dates, score_data[-5:]):
                     prediction_writer.writerow({"datetime": date.strftime("%Y-%m-%d %H:%M:%S"), "score": game["score"], "player_slug": slug})
                 
-                # Add 2 null rows for the next 2 days
+                # Add the null rows to forecast
                 last_game_date = last_5_games_dates[-1]
-                for i in range(1, 3):
+                for i in range(1, max(future_rows, forecast_length()) + 1):
                     future_date = last_game_date + pd.Timedelta(days=i)
                     prediction_writer.writerow({"datetime": future_date.strftime("%Y-%m-%d %H:%M:%S"), "score": None, "player_slug": slug})
 
+    save_watermarks(history_dir, watermarks)
     print("Data fetching and saving completed.")
     
-asyncio.run(main())
\ No newline at end of file
+with instrumentation.run("dl_my_players", user=userslug, incremental=incremental):
+    asyncio.run(main())
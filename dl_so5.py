@@ -1,136 +1,152 @@
 import json
 import os
-from datetime import datetime
-from gql import Client, gql
-from gql.transport.aiohttp import AIOHTTPTransport
 import csv
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import pandas as pd
+from sorare_client import SorareClient
+from response_cache import CacheMiss
+from score_store import write_scores, compact, latest_datetimes
+from score_sync import load_watermarks, save_watermarks, get_watermark, append_scores, format_datetime
+from batch_queries import fetch_scores_batched, fetch_clubs_batched, batch_size
+from rosters import save_roster, load_club_files
+import instrumentation
+from instrumentation import stage
 
 league = "premier-league"
 with open("data/" + league + ".json", "r") as file:
     league_data = json.load(file)
 
-# GraphQL endpoint
-url = "https://api.sorare.com/federation/graphql"
-
 # Directory to save the data
 data_dir = "data/" + league
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
 os.makedirs(data_dir + "/clubs", exist_ok=True)
 
+# Maximum number of API requests in flight at once (1 = one request at a time)
+max_in_flight = 8
+
+# Only fetch scores newer than what is already saved and append them to the existing files
+incremental = True
+
+# Number of club rosters requested together; players are packed batch_queries.batch_size per request
+club_batch_size = 5
+
+# Where scores go: "parquet" for the league partition of the score store, "csv" for one file per player
+score_format = "parquet"
+
+# Number of players buffered before a new part is written to the score store
+flush_every = 200
+
+def save_player_scores(slug, score_data):
+    print(f"Saving data for {slug}")
+    score_data.reverse()  # Reverse the list to start with the oldest entry
+    rows = [
+        {"datetime": format_datetime(item["game"]["date"]), "score": item["score"]}
+        for item in score_data
+    ]
+
+    if score_format == "parquet":
+        for row in rows:
+            row["slug"] = slug
+        pending_rows.extend(rows)
+        pending_players.append(slug)
+        if len(pending_players) >= flush_every:
+            flush_scores()
+    elif incremental:
+        append_scores(f"{data_dir}/{slug}.csv", rows)
+    else:
+        with open(f"{data_dir}/{slug}.csv", "w", newline="") as csvfile:
+            fieldnames = ["datetime", "score"]
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+
+            writer.writeheader()
+            writer.writerows(rows)
+
+    watermarks[slug] = rows[-1]["datetime"]
+
+def flush_scores():
+    if pending_rows:
+        write_scores(league, pd.DataFrame(pending_rows))
+    pending_rows.clear()
+    pending_players.clear()
+
+def watermark(slug):
+    # The store already holds the newest date of each player, CSV mode keeps them in watermarks.json
+    if score_format == "parquet":
+        return watermarks.get(slug)
+    return get_watermark(watermarks, slug, f"{data_dir}/{slug}.csv")
+
+async def process_players(execute_query, slugs, since):
+    # Write each player as soon as its history is complete. Players that could not be fetched
+    # (None) keep their watermark, so the next run picks them up.
+    async for slug, score_data in fetch_scores_batched(execute_query, slugs, since):
+        if score_data:
+            save_player_scores(slug, score_data)
+
+async def process_clubs(execute_query, club_slugs):
+    # A batch of rosters that still fails after the client's retries is skipped for this run,
+    # the other batches carry on
+    try:
+        clubs = await fetch_clubs_batched(execute_query, club_slugs)
+    except CacheMiss:
+        raise
+    except Exception as error:
+        print(f"Giving up on {len(club_slugs)} clubs for this run: {error!r}")
+        return
+
+    player_slugs = []
+    for club_slug, club_data in clubs.items():
+        if club_data["football"]["club"]:
+            print(f"Saving data for {club_slug}")
+            with open(f"{data_dir}/clubs/{club_slug}.json", "w") as jsonfile:
+                json.dump(club_data, jsonfile)
 
-transport = AIOHTTPTransport(
-    url="https://api.sorare.com/federation/graphql",
-    headers={
-       'APIKEY': os.getenv('SORARE_API_KEY')
-    },
-)
-
-async def fetch_player_scores(slug):
-    all_scores = []
-    async with Client(transport=transport) as session:
-        query_template = """
-            {{
-            football {{
-                player(slug: "{slug}") {{
-                allSo5Scores(after: "{after}", first: 50) {{
-                    pageInfo {{
-                    hasNextPage
-                    endCursor
-                    }}
-                    nodes {{
-                    score
-                    game {{
-                        date
-                    }}
-                    }}
-                }}
-                }}
-            }}
-            }}
-            """
-        after_cursor = ""  # Start with no cursor
-        has_next_page = True
-
-        while has_next_page:
-            query = query_template.format(slug=slug, after=after_cursor)
-            data = await session.execute(gql(query))
-            scores_data = data["football"]["player"]["allSo5Scores"]
-            nodes = scores_data["nodes"]
-            all_scores.extend(nodes)
-
-            has_next_page = scores_data["pageInfo"]["hasNextPage"]
-            if has_next_page:
-                after_cursor = scores_data["pageInfo"]["endCursor"]
-
-        return all_scores
-
-async def fetch_club_players(slug):
-    async with Client(transport=transport) as session:
-        query_template = """
-        {{
-            football {{
-                club(slug: "{slug}") {{
-                    activePlayers {{
-                        nodes {{
-                            slug
-                            displayName
-                            position
-                            so5Scores(last:15) {{
-                                score
-                            }}
-                        }}
-                    }}
-                }}
-            }}
-        }}
-        """
-
-        query = query_template.format(slug=slug)
-        data = await session.execute(gql(query))
-        return data
-
-def format_datetime(date_str):
-    # Parse the datetime string to a datetime object
-    dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
-    # Format the datetime object to the desired string format
-    return dt.strftime("%Y-%m-%d %H:%M:%S")
+            player_slugs.extend(
+                player["slug"] for player in club_data["football"]["club"]["activePlayers"]["nodes"]
+            )
 
-async def main():
-    for club in league_data["data"]["football"]["competition"]["clubs"]["nodes"]:
-        club_slug = club["slug"]
-        club_data = await fetch_club_players(club_slug)
+    since = {}
+    if incremental:
+        since = {slug: watermark(slug) for slug in player_slugs}
 
-        if club_data:
-            print(f"Saving data for {club_slug}")
-            with open(f"{data_dir}/clubs/{club_slug}.json", "w") as jsonfile:
-                json.dump(club_data, jsonfile, indent=4)
-        
-        
-        for player in club_data["football"]["club"]["activePlayers"][
-            "nodes"
-        ]:
-            slug = player["slug"]
-            score_data = await fetch_player_scores(slug)
-
-            if score_data:
-                print(f"Saving data for {slug}")
-                score_data.reverse()  # Reverse the list to start with the oldest entry
-                with open(f"{data_dir}/{slug}.csv", "w", newline="") as csvfile:
-                    fieldnames = ["datetime", "score"]
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-                    writer.writeheader()
-                    for item in score_data:
-                        formatted_date = format_datetime(item["game"]["date"])
-                        writer.writerow(
-                            {"datetime": formatted_date, "score": item["score"]}
-                        )
-
-        print("Data fetching and saving completed.")
+    # Players of these clubs are fetched while the other rosters are still loading,
+    # spread over as many concurrent batches as it takes to keep every request full
+    groups = -(-len(player_slugs) // batch_size)
+    await asyncio.gather(
+        *(process_players(execute_query, player_slugs[i::groups], since) for i in range(groups))
+    )
 
-import asyncio
-asyncio.run(main())
\ No newline at end of file
+async def main():
+    club_slugs = [club["slug"] for club in league_data["data"]["football"]["competition"]["clubs"]["nodes"]]
+
+    # One session for the whole run, the client caps how many requests are in flight
+    try:
+        with stage("fetch"):
+            async with SorareClient(max_in_flight=max_in_flight) as client:
+                await asyncio.gather(
+                    *(
+                        process_clubs(client.execute, club_slugs[start:start + club_batch_size])
+                        for start in range(0, len(club_slugs), club_batch_size)
+                    )
+                )
+    finally:
+        # Scores fetched so far are kept even when the run stops early
+        with stage("export"):
+            if score_format == "parquet":
+                # Leave a single file per league for the trainers to read
+                flush_scores()
+                compact(league)
+            else:
+                save_watermarks(data_dir, watermarks)
+
+    with stage("roster"):
+        # Typed roster index (club, position, last score, L9) for the notebook and the trainers,
+        # built from the club files, so clubs skipped this run keep their last-known roster
+        save_roster(league, {slug: club for slug, club in load_club_files(league).items() if slug in club_slugs})
+    print("Data fetching and saving completed.")
+
+pending_rows = []
+pending_players = []
+watermarks = latest_datetimes(league) if score_format == "parquet" else load_watermarks(data_dir)
+with instrumentation.run("dl_so5", league=league, score_format=score_format, incremental=incremental):
+    asyncio.run(main())
@@ -0,0 +1,194 @@
+import datetime
+import hashlib
+import os
+import sys
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from score_store import load_scores, list_leagues
+
+# Every forecast ever written, one row per run, player and step ahead, one Parquet partition
+# per league (or gallery, or "global"), one file per run, rows sorted by slug and step:
+#   data/store/forecasts/league=<league>/run-<run id>.parquet
+history_dir = "data/store/forecasts"
+
+# Rows per row group: a lookup by slug only reads the groups whose slug range contains it
+row_group_size = 4096
+
+schema = pa.schema(
+    [
+        ("run_id", pa.string()),
+        ("created", pa.timestamp("s")),
+        ("slug", pa.string()),
+        # Gameweeks ahead: 1 is the next game (runs older than multi-horizon forecasts have no step)
+        ("step", pa.int8()),
+        ("expected", pa.float32()),
+        ("lower", pa.float32()),
+        ("upper", pa.float32()),
+        ("template", pa.string()),
+        # Content hash of the scores the forecast was made from (change_tracking.series_hashes)
+        ("series_hash", pa.string()),
+    ]
+)
+
+
+def template_id(template_path):
+    # "<template name>-<content hash>": searches overwrite models/<league>_model.csv, the hash
+    # tells apart forecasts made by different versions of the same file
+    if template_path is None or not os.path.exists(template_path):
+        return template_path
+    with open(template_path, "rb") as file:
+        content_hash = hashlib.sha256(file.read()).hexdigest()[:12]
+    return f"{os.path.splitext(os.path.basename(template_path))[0]}-{content_hash}"
+
+
+def new_run_id(now):
+    # Microseconds keep runs of the same second in order, the random suffix keeps ids unique
+    return f"{now:%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:4]}"
+
+
+def append_forecasts(prediction, league, template=None, series_hashes=None):
+    # prediction: forecast, lower_forecast and upper_forecast frames, one column per player and
+    # one row per step (indexed by step, or steps 1, 2, ... in order). template is a template
+    # path (or "baseline"), or a Series of them indexed by slug when players of the same run
+    # come from different models. series_hashes (Series by slug) lets the next run tell which
+    # players' scores changed. Returns the run id.
+    now = datetime.datetime.now()
+    run_id = new_run_id(now)
+    created = now.replace(microsecond=0)
+
+    steps = prediction.forecast.index if prediction.forecast.index.name == "Step" else range(1, len(prediction.forecast) + 1)
+    frame = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "step": step,
+                    "expected": prediction.forecast.iloc[row],
+                    "lower": prediction.lower_forecast.iloc[row].reindex(prediction.forecast.columns),
+                    "upper": prediction.upper_forecast.iloc[row].reindex(prediction.forecast.columns),
+                }
+            )
+            for row, step in enumerate(steps)
+        ]
+    ).astype({"step": "int8", "expected": "float32", "lower": "float32", "upper": "float32"})
+    frame.index = frame.index.astype(str)
+    if isinstance(template, pd.Series):
+        frame["template"] = template.reindex(frame.index).map(template_id)
+    else:
+        frame["template"] = template_id(template)
+    frame["series_hash"] = series_hashes.reindex(frame.index) if series_hashes is not None else None
+    frame = frame.rename_axis("slug").reset_index().sort_values(["slug", "step"], kind="stable")
+    frame.insert(0, "run_id", run_id)
+    frame.insert(1, "created", pd.Timestamp(created))
+
+    folder = os.path.join(history_dir, f"league={league}")
+    os.makedirs(folder, exist_ok=True)
+    table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+    # Written under a temporary name so readers never see a half-written run
+    path = os.path.join(folder, f"run-{run_id}.parquet")
+    pq.write_table(table, path + ".tmp", row_group_size=row_group_size)
+    os.replace(path + ".tmp", path)
+    return run_id
+
+
+def run_ids(league):
+    # Run ids start with their creation time, sorted file names are the runs oldest first
+    folder = os.path.join(history_dir, f"league={league}")
+    names = sorted(name for name in os.listdir(folder) if name.endswith(".parquet")) if os.path.isdir(folder) else []
+    return [name[len("run-"):-len(".parquet")] for name in names]
+
+
+def latest_run_id(league):
+    ids = run_ids(league)
+    return ids[-1] if ids else None
+
+
+def load_history(leagues=None, slugs=None, runs=None):
+    # Forecasts of the given leagues, players and runs (everything by default), oldest run first.
+    # Leagues and runs select files by name; slugs are pushed down to the row groups.
+    if isinstance(leagues, str):
+        leagues = [leagues]
+    if not os.path.isdir(history_dir):
+        return pd.DataFrame(columns=schema.names + ["league"])
+    folders = [
+        os.path.join(history_dir, name)
+        for name in sorted(os.listdir(history_dir))
+        if name.startswith("league=") and (leagues is None or name.split("=", 1)[1] in leagues)
+    ]
+    files = [
+        os.path.join(folder, name)
+        for folder in folders
+        for name in sorted(os.listdir(folder))
+        if name.endswith(".parquet") and (runs is None or name[len("run-"):-len(".parquet")] in runs)
+    ]
+    if not files:
+        return pd.DataFrame(columns=schema.names + ["league"])
+
+    dataset = ds.dataset(
+        files,
+        schema=schema.append(pa.field("league", pa.string())),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("league", pa.string())]), flavor="hive"),
+        partition_base_dir=history_dir,
+    )
+    row_filter = ds.field("slug").isin(list(slugs)) if slugs is not None else None
+    history = dataset.to_table(filter=row_filter).to_pandas()
+    history["step"] = history["step"].fillna(1).astype("int8")
+    return history.sort_values(["created", "run_id", "slug", "step"], kind="stable").reset_index(drop=True)
+
+
+def player_history(slug):
+    # Every forecast of one player across runs and leagues
+    return load_history(slugs=[slug])
+
+
+def latest_forecasts(league, step=1):
+    # One step of the last run of a league, best expected score first
+    run_id = latest_run_id(league)
+    if run_id is None:
+        raise FileNotFoundError(f"No forecasts in {history_dir} for {league}")
+    latest = load_history(league, runs=[run_id])
+    latest = latest[latest["step"] == step]
+    return latest.sort_values("expected", ascending=False).reset_index(drop=True)
+
+
+def with_actuals(history):
+    # Adds each forecast's outcome: the player's step-th score after the run was created
+    # (NaN while that game has not been played or downloaded yet)
+    leagues = sorted(set(history["league"]))
+    if not set(leagues) <= set(list_leagues()):
+        leagues = None  # "global" forecasts span every league
+    scores = load_scores(leagues)[["slug", "datetime", "score"]].drop_duplicates(["slug", "datetime"]).sort_values(["slug", "datetime"], kind="stable")
+    scores = scores.rename(columns={"datetime": "actual_datetime", "score": "actual"})
+    scores["actual_datetime"] = scores["actual_datetime"].astype("datetime64[s]")
+    scores["position"] = scores.groupby("slug", sort=False).cumcount()
+
+    # Position of the first score after the run, then `step - 1` games further
+    history = history.assign(created=history["created"].astype("datetime64[s]"))
+    first = pd.merge_asof(
+        history.sort_values("created"),
+        scores[["slug", "actual_datetime", "position"]].sort_values("actual_datetime"),
+        left_on="created",
+        right_on="actual_datetime",
+        by="slug",
+        direction="forward",
+        allow_exact_matches=False,
+    )
+    first["position"] = first["position"] + first["step"] - 1
+    joined = first.drop(columns="actual_datetime").merge(scores, on=["slug", "position"], how="left").drop(columns="position")
+    return joined.sort_values(["created", "run_id", "slug", "step"], kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # python forecast_history.py <slug>: every past forecast of a player, with the actual scores
+    if len(sys.argv) < 2:
+        print("Usage: python forecast_history.py <slug>")
+    else:
+        history = player_history(sys.argv[1])
+        if history.empty:
+            print(f"No forecasts for {sys.argv[1]}")
+        else:
+            print(with_actuals(history).round(1).to_string(index=False))
@@ -0,0 +1,68 @@
+import os
+from types import SimpleNamespace
+import pandas as pd
+from forecast_history import append_forecasts
+
+# Gameweeks ahead to forecast, e.g. [1, 2, 3] to plan three gameweeks. Every trainer fits once
+# with forecast_length = the largest horizon and the forecast files and history keep the steps
+# listed here, labelled by step. Searches take longer with more steps (ensemble="all" builds
+# per-step mosaic ensembles).
+horizons = [1]
+
+
+def forecast_length():
+    return max(horizons)
+
+
+def horizon_rows(frame):
+    # Rows of a prediction frame (one per step ahead, step 1 first) kept in the outputs,
+    # indexed by step
+    steps = [step for step in horizons if step <= len(frame)]
+    return frame.iloc[[step - 1 for step in steps]].set_axis(pd.Index(steps, name="Step"))
+
+
+def save_forecasts(prediction, name, template=None, league=None, series_hashes=None):
+    # Writes ./<name>_forecasts.csv (expected scores) and ./<name>_forecasts_all.csv
+    # (forecast, upper_forecast and lower_forecast rows, one column per player), one row per
+    # step of `horizons`, and appends the run to forecast_history under `league` (default:
+    # name). template is the template the prediction comes from; baseline predictions say so
+    # themselves.
+    forecasts_df = horizon_rows(prediction.forecast)
+    upper_forecasts_df = horizon_rows(prediction.upper_forecast)
+    lower_forecasts_df = horizon_rows(prediction.lower_forecast)
+
+    run_id = append_forecasts(
+        SimpleNamespace(forecast=forecasts_df, upper_forecast=upper_forecasts_df, lower_forecast=lower_forecasts_df),
+        league or name,
+        getattr(prediction, "template", template),
+        series_hashes,
+    )
+    print(forecasts_df)
+    # Define the path where you want to save the CSV
+    forecasts_csv_path = f"./{name}_forecasts.csv"
+
+    # Make sure the directory exists before saving
+    os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
+
+    # Save the DataFrame to CSV, the step of each row first
+    forecasts_df.to_csv(forecasts_csv_path)
+
+    # Label the rows with the forecast type and step
+    all_forecasts_df = pd.concat(
+        [forecasts_df, upper_forecasts_df, lower_forecasts_df],
+        keys=["forecast", "upper_forecast", "lower_forecast"],
+        names=["Type", "Step"],
+    )
+
+    # Define the path where you want to save the CSV
+    forecasts_csv_path = f"./{name}_forecasts_all.csv"
+
+    # Make sure the directory exists before saving
+    os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
+
+    # Save the DataFrame to CSV
+    all_forecasts_df.to_csv(forecasts_csv_path)
+
+    # Confirmation message
+    print(f"Forecast CSV saved to {forecasts_csv_path}, run {run_id} added to the forecast history")
+    return run_id
@@ -0,0 +1,164 @@
+import datetime
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS or child CPU time
+    resource = None
+
+# One JSON line per run of a downloader or trainer: its stages and API traffic
+run_log = "logs/runs.jsonl"
+
+# The run being recorded in this process, stages and API requests are added to it
+current = None
+
+
+def peak_rss_mb():
+    # Highest resident memory of this process so far (ru_maxrss is in KB on Linux, bytes on macOS)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def rss_mb():
+    # Current resident memory, where /proc is available
+    try:
+        with open("/proc/self/statm") as file:
+            return round(int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def children_cpu():
+    # CPU seconds of finished child processes (AutoTS and joblib workers, process pools)
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600} hours, {(seconds // 60) % 60} minutes, {seconds % 60} seconds"
+
+
+@contextmanager
+def run(script, **params):
+    # Records everything until the block exits, then appends the run to run_log:
+    #
+    #     with instrumentation.run("train_league", league=league):
+    #         with instrumentation.stage("load"):
+    #             ...
+    global current
+    outer = current
+    current = {
+        "script": script,
+        "params": params,
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "status": "ok",
+        "stages": [],
+        "api": {"requests": 0, "queries": 0, "latencies": []},
+        "_stack": [],
+    }
+    start_wall, start_cpu, start_children = time.perf_counter(), time.process_time(), children_cpu()
+    try:
+        yield current
+    except BaseException as error:
+        current["status"] = f"failed: {error!r}"
+        raise
+    finally:
+        record = current
+        current = outer
+        record.pop("_stack")
+        record["wall"] = round(time.perf_counter() - start_wall, 3)
+        record["cpu"] = round(time.process_time() - start_cpu, 3)
+        record["children_cpu"] = round(children_cpu() - start_children, 3)
+        record["peak_rss_mb"] = peak_rss_mb()
+        record["api"] = summarize_requests(record["api"])
+        os.makedirs(os.path.dirname(run_log), exist_ok=True)
+        with open(run_log, "a") as file:
+            file.write(json.dumps(record) + "\n")
+        print(f"Time elapsed: {format_duration(record['wall'])} ({script} run logged to {run_log})")
+
+
+@contextmanager
+def stage(name):
+    # Wall time, CPU time and memory of a step. Nested stages are named "outer/inner".
+    # Outside of a run nothing is recorded.
+    if current is None:
+        yield
+        return
+    stack = current["_stack"]
+    stack.append(name)
+    path = "/".join(stack)
+    start_wall, start_cpu, start_children = time.perf_counter(), time.process_time(), children_cpu()
+    try:
+        yield
+    finally:
+        stack.pop()
+        current["stages"].append({
+            "name": path,
+            "wall": round(time.perf_counter() - start_wall, 3),
+            "cpu": round(time.process_time() - start_cpu, 3),
+            "children_cpu": round(children_cpu() - start_children, 3),
+            "rss_mb": rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+        })
+
+
+def record_request(latency, queries=1):
+    # Called by SorareClient for every request sent; `queries` is the number of aliased pages
+    if current is not None:
+        api = current["api"]
+        api["requests"] += 1
+        api["queries"] += queries
+        api["latencies"].append(latency)
+
+
+def record_api_stats(stats):
+    # Totals kept by the client (bytes, cache hits, retries), added to the run's API section
+    if current is not None:
+        current["api"].update(stats)
+
+
+def summarize_requests(api):
+    latencies = np.array(api.pop("latencies"))
+    if len(latencies):
+        api["latency_mean"] = round(float(latencies.mean()), 4)
+        api["latency_p50"], api["latency_p95"], api["latency_max"] = (
+            round(float(value), 4) for value in np.percentile(latencies, [50, 95, 100])
+        )
+    return api
+
+
+def load_runs(script=None):
+    # Run log as a frame, one row per run and stage, to compare runs
+    if not os.path.exists(run_log):
+        return pd.DataFrame()
+    with open(run_log) as file:
+        runs = [json.loads(line) for line in file if line.strip()]
+    rows = [
+        {"script": r["script"], "started": r["started"], "status": r["status"], **stage_record}
+        for r in runs
+        if script is None or r["script"] == script
+        for stage_record in r["stages"] + [{"name": "total", "wall": r["wall"], "cpu": r["cpu"],
+                                            "children_cpu": r["children_cpu"], "peak_rss_mb": r["peak_rss_mb"]}]
+    ]
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # python instrumentation.py [script]: wall seconds per stage for the last 10 runs
+    runs = load_runs(sys.argv[1] if len(sys.argv) > 1 else None)
+    if runs.empty:
+        print(f"No runs in {run_log}")
+    else:
+        last = runs[runs["started"].isin(sorted(runs["started"].unique())[-10:])]
+        print(last.pivot_table(index=["script", "started"], columns="name", values="wall", aggfunc="sum", sort=False).round(1).to_string())
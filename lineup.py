@@ -0,0 +1,113 @@
+import sys
+import numpy as np
+import pandas as pd
+from forecast_history import latest_forecasts
+from rosters import positions, load_roster, load_cards
+
+# An SO5 lineup: one player of each position plus an extra outfield player, never the same
+# player twice
+slots = positions + ["Extra"]
+
+# Lineups returned, best first
+top_n = 10
+
+# Value of a player: weighted sum of the forecast columns, e.g. {"expected": 0.5, "upper": 0.5}
+# to favour players with more upside
+value_weights = {"expected": 1.0}
+
+
+def player_values(forecasts, roster, weights=None, cards=None):
+    # forecasts: one row per player with slug, expected, lower and upper (forecast_history);
+    # roster: slug and position (rosters.load_roster); cards: optional Series of card counts
+    # per slug, players without a card are left out. Returns slug, position, value and cards.
+    weights = weights or value_weights
+    players = forecasts.merge(roster[["slug", "position"]].drop_duplicates("slug"), on="slug", how="inner")
+    players["value"] = sum(weight * players[column].astype("float64") for column, weight in weights.items())
+    players["cards"] = 1 if cards is None else players["slug"].map(cards).fillna(0).astype("int64")
+    players = players[(players["cards"] > 0) & players["value"].notna() & players["position"].notna()]
+    return players[["slug", "position", "value", "cards"]].reset_index(drop=True)
+
+
+def top_sums(left_values, left_picks, right_values, n):
+    # Best n sums of one element of each side, with the picks that make them. Applied one
+    # position at a time, this keeps n partial lineups instead of every combination: a partial
+    # lineup outside the best n cannot complete a top-n lineup, each of the n better ones
+    # completed the same way beats it.
+    sums = np.add.outer(left_values, right_values).ravel()
+    keep = np.argpartition(-sums, min(n, len(sums)) - 1)[:n]
+    left, right = np.divmod(keep, len(right_values))
+    return sums[keep], np.column_stack([left_picks[left], right])
+
+
+def best_lineups(players, n=None):
+    # Exact top-n lineups by total value. Only the best n + 4 players of each position can be
+    # part of them: a lineup using a worse player has at least n better lineups, one for each
+    # better player of that position it does not already use. The search then runs once per
+    # position the extra player can take (a pair of players of that position, one each of the
+    # others), merging the positions with top_sums.
+    n = n or top_n
+    k = n + len(slots) - 1
+    candidates = {}
+    for position in positions:
+        group = players[players["position"] == position].nlargest(k, "value")
+        if group.empty:
+            raise ValueError(f"No {position} available for a lineup")
+        candidates[position] = (group["slug"].to_numpy(), group["value"].to_numpy(np.float64))
+
+    found = []
+    for extra in positions[1:]:
+        extra_slugs, extra_values = candidates[extra]
+        if len(extra_values) < 2:
+            continue
+        first, second = np.triu_indices(len(extra_values), 1)
+
+        axes = [extra_values[first] + extra_values[second] if position == extra else candidates[position][1] for position in positions]
+        totals, picks = axes[0], np.arange(len(axes[0]))[:, np.newaxis]
+        for values in axes[1:]:
+            totals, picks = top_sums(totals, picks, values, n)
+
+        for total, lineup_picks in zip(totals, picks):
+            lineup = {}
+            for position, pick in zip(positions, lineup_picks):
+                if position == extra:
+                    lineup[position], lineup["Extra"] = extra_slugs[first[pick]], extra_slugs[second[pick]]
+                else:
+                    lineup[position] = candidates[position][0][pick]
+            found.append((total, lineup))
+
+    if not found:
+        raise ValueError("Not enough outfield players for a lineup")
+    found.sort(key=lambda item: -item[0])
+    return pd.DataFrame([{**lineup, "Total": total} for total, lineup in found[:n]], columns=slots + ["Total"])
+
+
+def disjoint_lineups(players, count):
+    # Up to `count` lineups for as many competitions, each card used once: the best lineup is
+    # taken, its cards are removed and the next one is picked from what is left (greedy)
+    players = players.copy()
+    lineups = []
+    for _ in range(count):
+        try:
+            lineup = best_lineups(players, 1)
+        except ValueError:
+            break
+        lineups.append(lineup)
+        used = players["slug"].isin(lineup.iloc[0][slots])
+        players.loc[used, "cards"] -= 1
+        players = players[players["cards"] > 0]
+    return pd.concat(lineups, ignore_index=True) if lineups else pd.DataFrame(columns=slots + ["Total"])
+
+
+if __name__ == "__main__":
+    # python lineup.py <league or user> [n [step]]: best lineups from the latest forecasts of a
+    # step ahead (1: next game), restricted to the cards of the gallery when a user's
+    # cards.json exists
+    name = sys.argv[1]
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else top_n
+    step = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    try:
+        cards = load_cards(name)
+    except FileNotFoundError:
+        cards = None
+    players = player_values(latest_forecasts(name, step), load_roster(name), cards=cards)
+    print(best_lineups(players, n).round(1).to_string())
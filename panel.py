@@ -0,0 +1,94 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+class ScorePanel:
+    # Every series of a training frame in one contiguous float32 matrix:
+    #
+    #     values[i]   scores of series i, right-aligned so the last column is everyone's latest
+    #                 game, NaN before the series starts
+    #     lengths[i]  number of scores of series i
+    #     slugs[i]    series id of row i, index_of[slug] the way back
+    #
+    # end_date is the synthetic date of the last column, one day per game going backwards
+    # (see dataset.build_training_frame). save() writes .npy files that load() memory-maps.
+
+    def __init__(self, slugs, values, lengths, end_date):
+        self.slugs = np.asarray(slugs, dtype=object)
+        self.values = values
+        self.lengths = lengths
+        self.end_date = pd.Timestamp(end_date)
+        self._index_of = None
+
+    @property
+    def index_of(self):
+        if self._index_of is None:
+            self._index_of = {slug: i for i, slug in enumerate(self.slugs)}
+        return self._index_of
+
+    def __len__(self):
+        return len(self.slugs)
+
+    @classmethod
+    def from_long(cls, final_df):
+        # Long training frame (datetime, value, series_id; rows of each series in date order)
+        codes, slugs = pd.factorize(final_df["series_id"], sort=True)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        scores = final_df["value"].to_numpy(np.float32)[order]
+
+        lengths = np.bincount(codes, minlength=len(slugs))
+        width = lengths.max() if len(slugs) else 0
+        starts = np.cumsum(lengths) - lengths
+        columns = width - lengths[codes] + np.arange(len(codes)) - starts[codes]
+
+        values = np.full((len(slugs), width), np.nan, dtype=np.float32)
+        values[codes, columns] = scores
+        end_date = final_df["datetime"].max() if len(final_df) else pd.Timestamp("NaT")
+        return cls(np.asarray(slugs), values, lengths.astype(np.int32), end_date)
+
+    def dates(self):
+        return pd.date_range(end=self.end_date, periods=self.values.shape[1], freq="D")
+
+    def series(self, slug):
+        i = self.index_of[slug]
+        return self.values[i, self.values.shape[1] - self.lengths[i]:]
+
+    def subset(self, mask):
+        # Panel of the rows selected by a boolean mask, leading all-NaN columns dropped
+        lengths = self.lengths[mask]
+        width = lengths.max() if len(lengths) else 0
+        values = np.ascontiguousarray(self.values[mask, self.values.shape[1] - width:])
+        return ScorePanel(self.slugs[mask], values, lengths, self.end_date)
+
+    def to_wide(self):
+        # Dates as index, one float32 column per series: what AutoTS.fit takes without
+        # date_col/value_col/id_col, and the layout it converts long frames to anyway
+        return pd.DataFrame(self.values.T, index=self.dates(), columns=pd.Index(self.slugs, name="series_id"))
+
+    def to_long(self):
+        # Same columns and row order as dataset.load_training_frame
+        rows, columns = np.nonzero(~np.isnan(self.values))
+        return pd.DataFrame({
+            "datetime": self.dates()[columns],
+            "value": self.values[rows, columns].astype(np.float64),
+            "series_id": self.slugs[rows],
+        })
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        np.save(os.path.join(folder, "values.npy"), self.values)
+        np.save(os.path.join(folder, "lengths.npy"), self.lengths)
+        with open(os.path.join(folder, "series.json"), "w") as file:
+            json.dump({"slugs": self.slugs.tolist(), "end_date": str(self.end_date)}, file)
+
+    @classmethod
+    def load(cls, folder, mmap=True):
+        # With mmap the matrix stays on disk and pages in as rows are read
+        values = np.load(os.path.join(folder, "values.npy"), mmap_mode="r" if mmap else None)
+        lengths = np.load(os.path.join(folder, "lengths.npy"))
+        with open(os.path.join(folder, "series.json"), "r") as file:
+            series = json.load(file)
+        return cls(series["slugs"], values, lengths, series["end_date"])
@@ -0,0 +1,102 @@
+import json
+import os
+import sqlite3
+import sys
+import unicodedata
+
+# One row per player (not per card), with the crawl cursor so an interrupted build resumes
+catalogue_path = "data/players.sqlite"
+
+
+def name_key(name):
+    # Lowercase without accents, so "mbappe" finds "Mbappé"
+    return unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower().strip()
+
+
+def name_keys(name):
+    # The name from each word on: "kylian mbappe" and "mbappe", so any word start matches
+    words = name_key(name).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def open_catalogue(path=catalogue_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS players (
+            slug TEXT PRIMARY KEY,
+            display_name TEXT
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS names (
+            name_key TEXT,
+            slug TEXT,
+            PRIMARY KEY (name_key, slug)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """)
+    return connection
+
+
+def get_meta(connection, key, default=None):
+    row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def set_meta(connection, key, value):
+    connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+
+def save_page(connection, players, cursor, done):
+    # Players of a page and the cursor after it are committed together: a crash never loses
+    # a committed page nor skips one. A slug seen again only refreshes its display name.
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO players VALUES (?, ?)",
+            [(player["slug"], player["displayName"]) for player in players],
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO names VALUES (?, ?)",
+            [(key, player["slug"]) for player in players for key in name_keys(player["displayName"])],
+        )
+        set_meta(connection, "cursor", cursor)
+        set_meta(connection, "done", done)
+
+
+def count_players(connection):
+    return connection.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+
+def _prefix_range(column, prefix):
+    # Range scan on the column's index instead of LIKE, which sqlite cannot index case-insensitively
+    return f"{column} >= ? AND {column} < ?", (prefix, prefix + "\uffff")
+
+
+def lookup(connection, prefix, limit=20):
+    # [(slug, display name)] whose slug or display name starts with prefix, slug matches first
+    slug_clause, slug_args = _prefix_range("slug", prefix.lower())
+    name_clause, name_args = _prefix_range("name_key", name_key(prefix))
+    rows = connection.execute(
+        f"SELECT slug, display_name FROM players WHERE {slug_clause} ORDER BY slug LIMIT ?", (*slug_args, limit)
+    ).fetchall()
+    rows += connection.execute(
+        f"SELECT players.slug, display_name FROM names JOIN players USING (slug) WHERE {name_clause} ORDER BY name_key LIMIT ?",
+        (*name_args, limit),
+    ).fetchall()
+    return list(dict.fromkeys(rows))[:limit]
+
+
+def export_json(connection, path="all_players.json"):
+    # Same layout as the former all_players.json, one entry per player
+    with open(path + ".tmp", "w") as file:
+        file.write("[")
+        for i, (slug, display_name) in enumerate(connection.execute("SELECT slug, display_name FROM players ORDER BY slug")):
+            file.write(("," if i else "") + "\n    " + json.dumps({"slug": slug, "displayName": display_name}))
+        file.write("\n]\n")
+    os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+    # python player_catalogue.py <slug or name prefix>
+    connection = open_catalogue()
+    for slug, display_name in lookup(connection, " ".join(sys.argv[1:])):
+        print(f"{slug}\t{display_name}")
@@ -0,0 +1,32 @@
+import instrumentation
+from instrumentation import stage
+from dataset import dataset_fingerprint
+from artifacts import load_model
+from refit import fit_template, min_rows
+from forecasts import save_forecasts
+
+league = "premier-league"
+template_path = "./models/" + "ligue-1-fr_model.csv"
+
+
+def predict(league, template_path):
+    # Reuse the fitted model when neither the template nor the league's data changed,
+    # otherwise refit the template (which stores a new artifact for the next run)
+    with stage("load_model"):
+        model = load_model(template_path, dataset_fingerprint(league, min_rows=min_rows))
+    if model is None:
+        print(f"No fitted model for {league} with {template_path} on the current data, refitting...")
+        model = fit_template(league, template_path)
+    else:
+        print(f"Reusing the fitted model for {league} with {template_path}")
+
+    with stage("predict"):
+        prediction = model.predict()
+    with stage("export"):
+        save_forecasts(prediction, league, template_path)
+    return prediction
+
+
+if __name__ == "__main__":
+    with instrumentation.run("predict", league=league, template=template_path):
+        predict(league, template_path)
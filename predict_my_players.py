@@ -0,0 +1,68 @@
+import sys
+from types import SimpleNamespace
+import pandas as pd
+import baseline
+import instrumentation
+from instrumentation import stage
+from artifacts import load_model
+from dataset import load_training_frame, dataset_fingerprint
+from forecasts import save_forecasts
+from refit import fit_template, min_rows
+
+# Gallery downloaded by dl_my_players.py, stored as its own partition of the score store
+userslug = "bananederungis"
+
+# Template applied to the gallery's series only: no search, one fit and one predict for every card
+template_path = "./models/" + "ligue-1-fr_model.csv"
+
+
+def predict_my_players(userslug, template_path, n_jobs="auto"):
+    # Players with at least refit.min_rows scores get the template's forecast, the others
+    # (and everyone when the template fails) the baseline.py forecast
+    every_player_df = load_training_frame(userslug, min_rows=1)
+    fallback = baseline.predict(every_player_df)
+
+    try:
+        # Reused as long as neither the template nor the gallery's scores changed
+        model = load_model(template_path, dataset_fingerprint(userslug, min_rows=min_rows))
+        if model is None:
+            model = fit_template(userslug, template_path, n_jobs)
+        with stage("predict"):
+            prediction = model.predict()
+    except Exception as error:
+        print(f"AutoTS failed for {userslug} ({error!r}), writing baseline forecasts instead")
+        return fallback
+
+    frames = {}
+    for name in ["forecast", "upper_forecast", "lower_forecast"]:
+        frame = getattr(prediction, name)
+        missing = getattr(fallback, name).drop(columns=frame.columns, errors="ignore").set_axis(frame.index)
+        frames[name] = pd.concat([frame, missing], axis=1)
+    # Recorded per player in the forecast history
+    template = pd.Series("baseline", index=frames["forecast"].columns)
+    template[prediction.forecast.columns] = template_path
+    return SimpleNamespace(template=template, **frames)
+
+
+def forecast_table(prediction, step=1):
+    # One row per player for a step ahead (1: next game), best expected score first
+    return pd.DataFrame({
+        "Expected Score": prediction.forecast.iloc[step - 1],
+        "Lower Bound": prediction.lower_forecast.iloc[step - 1],
+        "Upper Bound": prediction.upper_forecast.iloc[step - 1],
+    }).rename_axis("Slug").sort_values("Expected Score", ascending=False)
+
+
+if __name__ == "__main__":
+    # python predict_my_players.py [userslug [template.csv]]
+    if len(sys.argv) > 1:
+        userslug = sys.argv[1]
+    if len(sys.argv) > 2:
+        template_path = sys.argv[2]
+
+    with instrumentation.run("predict_my_players", user=userslug, template=template_path):
+        prediction = predict_my_players(userslug, template_path)
+        table = forecast_table(prediction)
+        with stage("export"):
+            save_forecasts(prediction, userslug)
+        print(table.round(1).to_string())
@@ -1,113 +1,108 @@
-import os
 import pandas as pd
-import datetime
-
-start_time = datetime.datetime.now()
-league = "premier-league"
-
-
-# Path to the data folder
-data_folder = "./data/" + league
-
-dfs = []
-for filename in os.listdir(data_folder):
-    # Check if the file is a CSV
-    if filename.endswith(".csv"):
-        # Extract the series_id from the filename
-        series_id = filename.split(".")[0]
-        
-        # Load the CSV file
-        df = pd.read_csv(os.path.join(data_folder, filename), parse_dates=["datetime"])
-        
-        # Rename 'score' column to 'value'
-        df.rename(columns={"score": "value"}, inplace=True)
-        
-        # Filter out rows where 'value' is 0
-        df = df[df["value"] != 0]
-        
-        # Assign series_id
-        df["series_id"] = series_id
-        
-        # Calculate the number of rows for the date range
-        number_of_rows = len(df)
-        if number_of_rows < 20:
-            continue
-        
-        # Create a date range ending today, one day per row, going backwards
-        end_date = pd.to_datetime("2024-02-19")
-        start_date = end_date - pd.Timedelta(days=number_of_rows - 1)
-        date_range = pd.date_range(start_date, periods=number_of_rows, freq="D")
-        
-        # Assign this date range to the datetime column of the DataFrame, in reverse order
-        df["datetime"] = date_range
-        
-        # Append the DataFrame to the list
-        dfs.append(df)
-
-# Concatenate all DataFrames in the list into a single DataFrame
-final_df = pd.concat(dfs, ignore_index=True)
-
 from autots import AutoTS
+import baseline
+import instrumentation
+from instrumentation import stage
+from dataset import load_training_frame, load_panel, dataset_fingerprint
+from artifacts import save_model
+import forecasts
+from forecasts import save_forecasts, forecast_length
+from change_tracking import series_hashes, reusable_forecasts, merge_predictions
 
-model = AutoTS(
-    forecast_length=1,
-    frequency="D",
-    ensemble="all",
-    max_generations=0,
-    num_validations=0,
-    no_negatives=True,
-    verbose=0,
-    constraint=2.0,
-    introduce_na=False
-)
-model = model.import_template(
-    "./models/" + "ligue-1-fr_model.csv",
-    method="only",
-    enforce_model_list=True,
-)
-
-
-model = model.fit(
-    final_df,
-    date_col="datetime",
-    value_col="value",
-    id_col="series_id",
-)
-
-
-prediction = model.predict()
-forecasts_df = prediction.forecast
-print(forecasts_df)
-# Define the path where you want to save the CSV
-forecasts_csv_path = f"./{league}_forecasts.csv"
-
-# Make sure the directory exists before saving
-os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
-
-# Save the DataFrame to CSV
-forecasts_df.to_csv(forecasts_csv_path, index=False)
-
-
-forecasts_df = prediction.forecast
-upper_forecasts_df = prediction.upper_forecast
-lower_forecasts_df = prediction.lower_forecast
-
-# Rename index to distinguish forecast types
-forecasts_df.index = ['forecast']
-upper_forecasts_df.index = ['upper_forecast']
-lower_forecasts_df.index = ['lower_forecast']
-
-# Concatenate the forecasts vertically
-all_forecasts_df = pd.concat([forecasts_df, upper_forecasts_df, lower_forecasts_df])
-
-# Define the path where you want to save the CSV
-forecasts_csv_path = f"./{league}_forecasts_all.csv"
-
-# Make sure the directory exists before saving
-os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
-
-# Save the DataFrame to CSV
-all_forecasts_df.to_csv(forecasts_csv_path, index_label='Type')
+league = "premier-league"
+template_path = "./models/" + "ligue-1-fr_model.csv"
+
+# Series with fewer scores than this are not forecast
+min_rows = 20
+
+# "autots" refits the template, "baseline" only writes the fast baseline.py forecasts
+engine = "autots"
+
+# Write the baseline forecasts instead when the template fails to fit
+fallback_to_baseline = True
+
+# Only re-forecast the players whose scores changed since the league's last run with this
+# template, the others keep the forecasts stored in forecast_history
+incremental = True
+
+
+def fit_template(league, template_path, n_jobs="auto", wide_df=None):
+    # Scores of the league, filtered and re-dated in one pass (cached until the store changes).
+    # wide_df (ScorePanel.to_wide) fits some of the series only, that model is not stored.
+    final_df = load_training_frame(league, min_rows=min_rows) if wide_df is None else wide_df
+
+    model = AutoTS(
+        forecast_length=forecast_length(),
+        frequency="D",
+        ensemble="all",
+        max_generations=0,
+        num_validations=0,
+        no_negatives=True,
+        verbose=0,
+        constraint=2.0,
+        introduce_na=False,
+        n_jobs=n_jobs,
+    )
+    model = model.import_template(
+        template_path,
+        method="only",
+        enforce_model_list=True,
+    )
+
+    with stage("fit"):
+        if wide_df is not None:
+            return model.fit(wide_df)
+        model = model.fit(
+            final_df,
+            date_col="datetime",
+            value_col="value",
+            id_col="series_id",
+        )
+
+    # Keep the fitted model so predict.py can reuse it while the data does not change
+    with stage("export"):
+        save_model(model, template_path, dataset_fingerprint(league, min_rows=min_rows))
+    return model
+
+
+def refresh(league, template_path, n_jobs="auto"):
+    # Forecasts of every series of the league, fitting the template on the changed series only.
+    # Returns the prediction and the series hashes to store with it.
+    panel = load_panel(league, min_rows=min_rows)
+    hashes = series_hashes(panel)
+    with stage("changes"):
+        reused = reusable_forecasts(league, hashes, template_path, forecasts.horizons)
+        if not incremental:
+            reused = reused.iloc[:0]
+        changed = ~pd.Index(panel.slugs).isin(reused["slug"])
+    print(f"{changed.sum()} of {len(panel)} series changed, {len(panel) - changed.sum()} forecasts reused")
+
+    prediction = None
+    if changed.any():
+        try:
+            model = fit_template(league, template_path, n_jobs, None if changed.all() else panel.subset(changed).to_wide())
+            with stage("predict"):
+                prediction = model.predict()
+        except Exception as error:
+            if not fallback_to_baseline:
+                raise
+            print(f"AutoTS failed for {league} ({error!r}), writing baseline forecasts instead")
+            prediction = baseline.predict_panel(panel.subset(changed))
+    next_date = panel.end_date + pd.Timedelta(days=1)
+    return merge_predictions(prediction, reused, template_path, next_date, forecast_length()), hashes
+
+
+def refit(league, template_path, n_jobs="auto"):
+    with instrumentation.run("refit", league=league, template=template_path, engine=engine, incremental=incremental, n_jobs=n_jobs):
+        hashes = None
+        if engine == "baseline":
+            prediction = baseline.predict(load_training_frame(league, min_rows=min_rows))
+        else:
+            prediction, hashes = refresh(league, template_path, n_jobs)
+        with stage("export"):
+            save_forecasts(prediction, league, template_path, series_hashes=hashes)
+
+
+if __name__ == "__main__":
+    refit(league, template_path)
 
-# Confirmation message
-print(f"Forecast CSV saved to {forecasts_csv_path}")
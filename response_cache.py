@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from graphql import print_ast
+
+# One JSON file per (document, variables), reused across runs while fresh
+cache_dir = "data/cache/responses"
+
+# Seconds a cached response stays fresh, by what it holds. A page after a cursor holds older
+# games that do not change; a new game only changes the first page, whose new end cursor
+# then asks for pages that are not cached yet.
+ttl_history = 30 * 24 * 3600  # allSo5Scores pages after a cursor
+ttl_recent = 3600  # first allSo5Scores page: the latest games
+ttl_rosters = 15 * 60  # activePlayers rosters and card lists, they change with transfers and trades
+ttl_default = 3600
+
+# SORARE_OFFLINE=1 serves every request from the cache, whatever its age, and never connects
+offline = os.getenv("SORARE_OFFLINE") == "1"
+
+
+class CacheMiss(LookupError):
+    pass
+
+
+def response_key(url, document, variables):
+    # The endpoint is part of the key: a stand-in server's pages are never served to real runs
+    text = url + print_ast(document) + json.dumps(variables or {}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def response_ttl(document, variables):
+    text = print_ast(document)
+    if "activePlayers" in text or "Cards" in text:
+        return ttl_rosters
+    if "allSo5Scores" in text:
+        # Aliased batches are only as old as their most recent page
+        cursors = [value for name, value in (variables or {}).items() if name.startswith("after")]
+        return ttl_history if cursors and all(cursors) else ttl_recent
+    return ttl_default
+
+
+def cache_path(key):
+    return os.path.join(cache_dir, key[:2], key + ".json")
+
+
+def load_response(url, document, variables, max_age=None):
+    # Cached result, or None when missing or older than max_age (default: the document's TTL)
+    path = cache_path(response_key(url, document, variables))
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as file:
+        entry = json.load(file)
+    if max_age is None:
+        max_age = response_ttl(document, variables)
+    if time.time() - entry["stored"] > max_age:
+        return None
+    return entry["result"]
+
+
+def save_response(url, document, variables, result):
+    path = cache_path(response_key(url, document, variables))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        json.dump({"stored": time.time(), "result": result}, file)
+    os.replace(path + ".tmp", path)
+
+
+def prune(max_age=ttl_history):
+    # Removes entries no TTL can still serve, returns how many
+    removed = 0
+    for folder, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(folder, name)
+            if time.time() - os.path.getmtime(path) > max_age:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    # python response_cache.py prune|clear
+    if sys.argv[1:] == ["clear"]:
+        print(f"Removed {prune(max_age=-1)} cached responses")
+    else:
+        print(f"Removed {prune()} expired responses")
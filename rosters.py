@@ -0,0 +1,113 @@
+import json
+import os
+from collections import Counter
+import pandas as pd
+
+data_main_folder = "./data/"
+
+# Positions used by the API for football players
+positions = ["Goalkeeper", "Defender", "Midfielder", "Forward"]
+
+# One typed table per league with every rostered player, written by the downloaders next to clubs/
+roster_file = "roster.parquet"
+
+# Cards owned per player of a gallery, written by dl_my_players.py next to its roster
+cards_file = "cards.json"
+
+
+def roster_path(league):
+    return os.path.join(data_main_folder, league, roster_file)
+
+
+def build_roster(clubs):
+    # {club slug: club response} -> one row per player with its club, position and recent scores.
+    # so5Scores holds the last 15 scores, newest first. L9 is the notebook's figure: the mean
+    # of the scores before the last one, zeros (games not played) excluded.
+    rows = [
+        (player["slug"], player.get("displayName"), club_slug, player.get("position"), i, score["score"])
+        for club_slug, club_data in clubs.items()
+        if club_data["football"]["club"]
+        for player in club_data["football"]["club"]["activePlayers"]["nodes"]
+        for i, score in enumerate(player.get("so5Scores") or [{"score": None}])
+    ]
+    scores = pd.DataFrame(rows, columns=["slug", "display_name", "club", "position", "game", "score"])
+    scores["score"] = scores["score"].astype("float32")
+
+    played = scores["score"].where(scores["score"] != 0)
+    by_player = scores.assign(played=played, before_last=played.where(scores["game"] > 0)).groupby("slug", sort=True)
+    roster = by_player.agg(
+        display_name=("display_name", "first"),
+        club=("club", "first"),
+        position=("position", "first"),
+        last_score=("score", "first"),
+        l9=("before_last", "mean"),
+        games_played=("played", "count"),
+    )
+    roster["last_score"] = roster["last_score"].fillna(0)
+    roster["l9"] = roster["l9"].fillna(0).astype("float32")
+    roster["games_played"] = roster["games_played"].astype("int8")
+    roster["club"] = roster["club"].astype("category")
+    roster["position"] = pd.Categorical(roster["position"], categories=positions)
+    return roster.reset_index().astype({"slug": "string", "display_name": "string"})
+
+
+def save_roster(league, clubs):
+    roster = build_roster(clubs)
+    path = roster_path(league)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    roster.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return roster
+
+
+def load_club_files(league):
+    clubs_folder = os.path.join(data_main_folder, league, "clubs")
+    clubs = {}
+    if os.path.isdir(clubs_folder):
+        for filename in sorted(os.listdir(clubs_folder)):
+            if filename.endswith(".json"):
+                with open(os.path.join(clubs_folder, filename)) as file:
+                    clubs[filename[:-5]] = json.load(file)
+    return clubs
+
+
+def load_roster(leagues=None):
+    # Rosters of the given leagues (default: every league under data/) in one frame with a
+    # league column. A league downloaded before the index existed is indexed from its club
+    # files once.
+    if isinstance(leagues, str):
+        leagues = [leagues]
+    leagues = leagues or sorted(os.listdir(data_main_folder))
+    frames = []
+    for league in leagues:
+        if os.path.exists(roster_path(league)):
+            frames.append(pd.read_parquet(roster_path(league)).assign(league=league))
+        elif os.path.isdir(os.path.join(data_main_folder, league, "clubs")):
+            frames.append(save_roster(league, load_club_files(league)).assign(league=league))
+    if not frames:
+        return build_roster({}).assign(league=pd.Series(dtype="string"))
+    roster = pd.concat(frames, ignore_index=True)
+    roster["club"] = roster["club"].astype("category")
+    roster["position"] = pd.Categorical(roster["position"], categories=positions)
+    roster["league"] = roster["league"].astype("category")
+    return roster
+
+
+def save_cards(userslug, cards):
+    # cards: the user's card nodes, several cards can share a player
+    path = os.path.join(data_main_folder, userslug, cards_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(Counter(card["player"]["slug"] for card in cards if card.get("player")), file)
+
+
+def load_cards(userslug):
+    # Series of card counts indexed by player slug
+    with open(os.path.join(data_main_folder, userslug, cards_file)) as file:
+        return pd.Series(json.load(file), dtype="int64")
+
+
+def player_positions(leagues=None):
+    # {player slug: position} from the roster indexes, first league (alphabetically) wins
+    roster = load_roster(leagues).drop_duplicates("slug")
+    return dict(zip(roster["slug"], roster["position"].astype(object)))
@@ -0,0 +1,76 @@
+import os
+import sys
+import datetime
+from concurrent.futures import as_completed
+from score_store import list_leagues
+from workers import process_pool
+
+# "train" runs the template search of train_league.py for every league,
+# "refit" applies each league's template (or default_template) like refit.py
+mode = "train"
+
+# Template used in refit mode for leagues that have no models/<league>_model.csv yet
+default_template = "./models/ligue-1-fr_model.csv"
+
+# Cores shared by all leagues; each worker process gets an equal slice for AutoTS
+cpu_budget = os.cpu_count()
+
+# Upper bound on leagues processed at once (None = one worker per league, within the CPU budget)
+max_workers = None
+
+
+def discover_leagues():
+    # Leagues in the score store that were downloaded as leagues (they have club rosters);
+    # user galleries such as data/<user>/ are left out
+    return [league for league in list_leagues() if os.path.isdir(f"data/{league}/clubs")]
+
+
+def league_template(league):
+    template_path = f"./models/{league}_model.csv"
+    return template_path if os.path.exists(template_path) else default_template
+
+
+def run_league(mode, league, n_jobs, template_path):
+    # Runs in a worker process, every league writes its own models/ and forecast files
+    start_time = datetime.datetime.now()
+    if mode == "train":
+        from train_league import train
+        train(league, n_jobs=n_jobs)
+    else:
+        from refit import refit
+        refit(league, template_path, n_jobs=n_jobs)
+    return (datetime.datetime.now() - start_time).total_seconds()
+
+
+def run_all(mode, leagues=None):
+    leagues = leagues or discover_leagues()
+    if not leagues:
+        print("No leagues to run")
+        return []
+    workers = min(len(leagues), max_workers or cpu_budget, cpu_budget)
+    n_jobs = max(1, cpu_budget // workers)
+    print(f"{mode}: {len(leagues)} leagues on {workers} workers with {n_jobs} cores each")
+
+    # Keep the numerical libraries inside each worker's share of the budget
+    failed = []
+    with process_pool(workers, n_jobs) as executor:
+        futures = {executor.submit(run_league, mode, league, n_jobs, league_template(league)): league for league in leagues}
+        for future in as_completed(futures):
+            league = futures[future]
+            try:
+                seconds = future.result()
+                print(f"{league} done in {seconds / 60:.1f} minutes")
+            except Exception as error:
+                # One failing league does not stop the others
+                print(f"{league} failed: {error!r}")
+                failed.append(league)
+    return failed
+
+
+if __name__ == "__main__":
+    # Optional arguments: mode, then the leagues to run (default: every league found)
+    if len(sys.argv) > 1:
+        mode = sys.argv[1]
+    failed = run_all(mode, sys.argv[2:])
+    if failed:
+        sys.exit(f"Failed leagues: {', '.join(failed)}")
@@ -0,0 +1,101 @@
+import asyncio
+import random
+import time
+import aiohttp
+from gql.transport.exceptions import TransportServerError, TransportProtocolError, TransportQueryError
+
+# Requests per second: the limiter starts at initial_rate and adapts between min_rate and
+# max_rate, growing slowly while requests succeed and halving on every rate-limit response
+initial_rate = 8.0
+min_rate = 0.5
+max_rate = 40.0
+rate_increase = 0.2  # requests per second added for every second of successful traffic
+rate_decrease = 0.5
+
+# Requests that can start back to back after an idle period
+burst = 4
+
+# Retries of a failed request, waiting a random time up to backoff_base * 2 ** attempt
+# (capped at backoff_cap seconds) or the server's Retry-After when it is longer
+max_retries = 6
+backoff_base = 1.0
+backoff_cap = 60.0
+
+# HTTP statuses worth retrying, 429 also slows the limiter down
+retry_statuses = {429, 500, 502, 503, 504}
+
+
+def classify(error):
+    # "throttled" for rate-limit responses, "retry" for other transient failures, None otherwise.
+    # A 429 with a JSON body reaches us as a GraphQL error, recognised by its message.
+    if isinstance(error, TransportServerError):
+        if error.code == 429:
+            return "throttled"
+        return "retry" if error.code in retry_statuses else None
+    if isinstance(error, TransportQueryError):
+        message = str(error).lower()
+        return "throttled" if "rate limit" in message or "too many requests" in message else None
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, TransportProtocolError)):
+        return "retry"
+    return None
+
+
+def retry_after(error):
+    # Retry-After seconds of a failed response, when the server sent one
+    cause = error.__cause__
+    headers = getattr(cause, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    # Token bucket shared by every request of a client. acquire() waits for a token,
+    # then the caller reports the outcome with on_success() or on_error(), which returns
+    # how long to wait before retrying (None when the error is final).
+
+    def __init__(self, rate=initial_rate):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.stats = {"retries": 0, "throttled": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens go out in arrival order
+        async with self.lock:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(max_rate, self.rate + rate_increase / self.rate)
+
+    def on_error(self, error, attempt):
+        kind = classify(error)
+        if kind is None or attempt >= max_retries:
+            return None
+
+        delay = random.uniform(0, min(backoff_cap, backoff_base * 2 ** attempt))
+        if kind == "throttled":
+            # Slow everyone down, and hold every request until the server's delay is over
+            self.stats["throttled"] += 1
+            self.rate = max(min_rate, self.rate * rate_decrease)
+            self.tokens = 0.0
+            delay = max(delay, retry_after(error) or 0)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.stats["retries"] += 1
+        return delay
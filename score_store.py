@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Every score of every player, one Parquet partition per league:
+#   data/store/scores/league=<league>/part-<write time in ns>-<id>.parquet
+# Sorted file names are the parts in write order, the newest copy of a score is the last one.
+store_dir = "data/store/scores"
+
+schema = pa.schema(
+    [
+        ("slug", pa.string()),
+        ("datetime", pa.timestamp("s")),
+        ("score", pa.float32()),
+    ]
+)
+
+
+def league_dir(league):
+    return os.path.join(store_dir, f"league={league}")
+
+
+def list_leagues():
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        name.split("=", 1)[1] for name in os.listdir(store_dir) if name.startswith("league=")
+    )
+
+
+def part_files(leagues=None):
+    # Files backing the given leagues (all of them by default), used to fingerprint the store
+    files = []
+    for league in leagues or list_leagues():
+        folder = league_dir(league)
+        if os.path.isdir(folder):
+            files.extend(
+                os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith(".parquet")
+            )
+    return files
+
+
+def read_parts(files, columns=None):
+    # The league column comes from the league=<league> directory of each file
+    dataset = ds.dataset(
+        files,
+        schema=schema.append(pa.field("league", pa.string())),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("league", pa.string())]), flavor="hive"),
+        partition_base_dir=store_dir,
+    )
+    return dataset.to_table(columns=columns)
+
+
+def write_scores(league, scores, replace=False):
+    # scores: DataFrame with slug, datetime and score columns. Each call adds one part file;
+    # replace=True drops the league's existing parts first.
+    folder = league_dir(league)
+    if replace and os.path.isdir(folder):
+        for path in part_files([league]):
+            os.remove(path)
+    os.makedirs(folder, exist_ok=True)
+
+    frame = pd.DataFrame(
+        {
+            "slug": scores["slug"].astype(str),
+            "datetime": pd.to_datetime(scores["datetime"]),
+            "score": scores["score"].astype("float32"),
+        }
+    )
+    table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+    # Written under a temporary name so readers never see a half-written part
+    path = os.path.join(folder, f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_scores(leagues=None):
+    # One bulk read of the requested leagues (all by default), sorted by league, slug and date.
+    # Parts can overlap after a full re-download, duplicates are dropped here, the score of
+    # the newest part wins.
+    if isinstance(leagues, str):
+        leagues = [leagues]
+    files = part_files(leagues)
+    if not files:
+        raise FileNotFoundError(
+            f"No scores in {store_dir} for {leagues or 'any league'}, run `python score_store.py migrate` first"
+        )
+
+    scores = read_parts(files).to_pandas()
+    scores["league"] = scores["league"].astype("category")
+
+    scores = scores.drop_duplicates(subset=["league", "slug", "datetime"], keep="last")
+    return scores.sort_values(["league", "slug", "datetime"], kind="stable").reset_index(drop=True)
+
+
+def latest_datetimes(league):
+    # Newest saved game for every player of the league, in the downloaders' watermark format
+    if not part_files([league]):
+        return {}
+    scores = read_parts(part_files([league]), columns=["slug", "datetime"]).to_pandas()
+    latest = scores.groupby("slug")["datetime"].max()
+    return latest.dt.strftime("%Y-%m-%d %H:%M:%S").to_dict()
+
+
+def compact(league):
+    # Rewrite a league's parts as a single deduplicated file
+    paths = part_files([league])
+    if len(paths) <= 1:
+        return
+    scores = load_scores(league)
+    write_scores(league, scores)
+    for path in paths:
+        os.remove(path)
+
+
+def migrate_csv_tree(data_root="data"):
+    # One-off import of the per-player CSV files (data/<league>/<slug>.csv) into the store
+    for league in sorted(os.listdir(data_root)):
+        league_folder = os.path.join(data_root, league)
+        if not os.path.isdir(league_folder) or league == "store":
+            continue
+
+        frames = []
+        for filename in os.listdir(league_folder):
+            if filename.endswith(".csv"):
+                df = pd.read_csv(os.path.join(league_folder, filename), usecols=["datetime", "score"])
+                df["slug"] = filename.split(".")[0]
+                frames.append(df)
+        if frames:
+            print(f"Migrating {len(frames)} players of {league}...")
+            write_scores(league, pd.concat(frames, ignore_index=True), replace=True)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        migrate_csv_tree()
+    elif command == "compact":
+        for league in list_leagues():
+            compact(league)
+    else:
+        print("Usage: python score_store.py migrate|compact")
@@ -0,0 +1,72 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+# File kept in each data directory with, for every player, the date of the newest game already on disk
+WATERMARKS_FILE = "watermarks.json"
+
+
+def format_datetime(date_str):
+    # Game dates come from the API as "%Y-%m-%dT%H:%M:%SZ" and are saved as "%Y-%m-%d %H:%M:%S"
+    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d %H:%M:%S")
+
+
+def load_watermarks(data_dir):
+    path = os.path.join(data_dir, WATERMARKS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_watermarks(data_dir, watermarks):
+    # Write to a temporary file first so an interrupted run never leaves a truncated file
+    path = os.path.join(data_dir, WATERMARKS_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(watermarks, file, indent=4, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def last_saved_datetime(csv_path):
+    # Score files are written oldest first, so the newest date is on the last line
+    if not os.path.exists(csv_path):
+        return None
+    with open(csv_path, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        file.seek(max(0, file.tell() - 1024))
+        lines = file.read().decode().splitlines()
+    for line in reversed(lines):
+        if line and not line.startswith("datetime"):
+            return line.split(",")[0]
+    return None
+
+
+def get_watermark(watermarks, slug, csv_path):
+    # A missing file always means a full download
+    if not os.path.exists(csv_path):
+        return None
+    # Players saved before watermarks existed fall back to the file itself
+    return watermarks.get(slug) or last_saved_datetime(csv_path)
+
+
+def is_newer(date, watermark):
+    # Dates are "%Y-%m-%d %H:%M:%S" strings, which sort chronologically
+    return watermark is None or date > watermark
+
+
+def append_scores(csv_path, rows, fieldnames=("datetime", "score")):
+    # rows are dicts ordered oldest first. Anything not newer than the file's last row is dropped,
+    # so re-running after an interrupted run never duplicates scores.
+    last = last_saved_datetime(csv_path)
+    rows = [row for row in rows if is_newer(row["datetime"], last)]
+    if not rows:
+        return 0
+
+    write_header = not os.path.exists(csv_path)
+    with open(csv_path, "a", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=list(fieldnames))
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+    return len(rows)
@@ -1,76 +1,52 @@
-import json
-import os
-from gql import Client, gql
-from gql.transport.aiohttp import AIOHTTPTransport
 import asyncio
-from dotenv import load_dotenv
+from sorare_client import SorareClient, ALL_CARDS
+from player_catalogue import open_catalogue, get_meta, save_page, count_players, export_json
+import instrumentation
+from instrumentation import stage
+
+# Cards requested per page
+page_size = 100
+
+# Start over from the first page even when the last build completed (rows are kept and refreshed)
+refresh = True
+
+# Pages through every card, writing each page's players to the catalogue as it arrives
+async def build_catalogue(client, connection):
+    cursor = get_meta(connection, "cursor")
+    if get_meta(connection, "done", False):
+        if not refresh:
+            return
+        cursor = None
+    elif cursor:
+        print(f"Resuming after {count_players(connection)} players")
 
-# Load environment variables
-load_dotenv()
-
-# GraphQL endpoint
-url = "https://api.sorare.com/federation/graphql"
-
-transport = AIOHTTPTransport(
-    url=url,
-    headers={"APIKEY": os.getenv("SORARE_API_KEY")},
-)
-client = Client(transport=transport, fetch_schema_from_transport=True)
-
-# Function to execute a GraphQL query
-async def execute_query(query):
-    async with Client(
-        transport=transport, fetch_schema_from_transport=True
-    ) as session:
-        result = await session.execute(query)
-    return result
-
-# Function to fetch all pages of results
-async def fetch_all_players():
-    players = []
     has_next_page = True
-    cursor = ""
-
+    pages = 0
     while has_next_page:
-        query_template = f"""
-        {{
-            football {{
-                allCards(first: 100, after: "{cursor}") {{
-                    nodes {{
-                        player {{
-                            slug
-                            displayName
-                        }}
-                    }}
-                    pageInfo {{
-                        endCursor
-                        hasNextPage
-                    }}
-                }}
-            }}
-        }}
-        """
-        query = gql(query_template)
-        result = await execute_query(query)
+        result = await client.execute(ALL_CARDS, {"first": page_size, "after": cursor})
         cards = result["football"]["allCards"]["nodes"]
-        print(cards)
         page_info = result["football"]["allCards"]["pageInfo"]
 
-        players.extend(cards)
         cursor = page_info["endCursor"]
         has_next_page = page_info["hasNextPage"]
+        save_page(connection, [card["player"] for card in cards if card.get("player")], cursor, not has_next_page)
 
-    return players
+        pages += 1
+        if pages % 50 == 0:
+            print(f"{pages} pages, {count_players(connection)} players")
 
 # Main function to encapsulate the logic
 async def main():
-    players = await fetch_all_players()
-    player_data = [{"slug": player["player"]["slug"], "displayName": player["player"]["displayName"]} for player in players if "player" in player]
-    
-    with open("all_players.json", "w") as file:
-        json.dump(player_data, file, indent=4)
+    connection = open_catalogue()
+    # This script used to introspect the schema before every page, the client reuses the cached one
+    with stage("fetch"):
+        async with SorareClient(legacy_introspection=True) as client:
+            await build_catalogue(client, connection)
 
-    print("Player data has been saved to players.json")
+    with stage("export"):
+        export_json(connection, "all_players.json")
+    print(f"{count_players(connection)} players saved to all_players.json")
 
 # Execute the main function
-asyncio.run(main())
+with instrumentation.run("search_player"):
+    asyncio.run(main())
@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+import aiohttp
+from gql import Client, gql
+from gql.transport.aiohttp import AIOHTTPTransport
+from graphql import build_client_schema, build_schema, get_introspection_query, print_schema
+from dotenv import load_dotenv
+import instrumentation
+import response_cache
+from scheduler import RequestScheduler
+
+load_dotenv()
+
+# GraphQL endpoint, SORARE_API_URL points the downloaders at another server (e.g. a local stand-in)
+url = os.getenv("SORARE_API_URL", "https://api.sorare.com/federation/graphql")
+
+# Schema saved after the first introspection of each endpoint, delete it to fetch a fresh one
+schema_folder = "data"
+
+score_selection = """
+    allSo5Scores(after: $after{i}, first: 50) {{
+        pageInfo {{
+            hasNextPage
+            endCursor
+        }}
+        nodes {{
+            score
+            game {{
+                date
+            }}
+        }}
+    }}
+"""
+
+club_selection = """
+    activePlayers {
+        nodes {
+            slug
+            displayName
+            position
+            so5Scores(last:15) {
+                score
+            }
+        }
+    }
+"""
+
+# Documents are parsed once here and reused with different variables for every request
+PLAYER_SCORES = gql("""
+query PlayerScores($slug: String!, $after: String) {
+    football {
+        player(slug: $slug) {
+""" + score_selection.format(i="") + """
+        }
+    }
+}
+""")
+
+CLUB_PLAYERS = gql("""
+query ClubPlayers($slug: String!) {
+    football {
+        club(slug: $slug) {
+""" + club_selection + """
+        }
+    }
+}
+""")
+
+USER_CARDS = gql("""
+query UserCards($slug: String!, $first: Int, $after: String) {
+    user(slug: $slug) {
+        footballCards(first: $first, after: $after) {
+            nodes {
+                player {
+                    slug
+                    displayName
+                    position
+                    so5Scores(last:15) {
+                        score
+                    }
+                }
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+}
+""")
+
+ALL_CARDS = gql("""
+query AllCards($first: Int, $after: String) {
+    football {
+        allCards(first: $first, after: $after) {
+            nodes {
+                player {
+                    slug
+                    displayName
+                }
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+}
+""")
+
+
+@lru_cache(maxsize=None)
+def player_scores_batch(size):
+    # Aliased document for `size` players: alias p<i> reads variables $slug<i> and $after<i>.
+    # Cached per size, so every batch of the same size reuses the same parsed document.
+    variables = ", ".join(f"$slug{i}: String!, $after{i}: String" for i in range(size))
+    fields = "\n".join(
+        f"p{i}: player(slug: $slug{i}) {{" + score_selection.format(i=i) + "}"
+        for i in range(size)
+    )
+    return gql(f"query PlayerScoresBatch({variables}) {{ football {{ {fields} }} }}")
+
+
+@lru_cache(maxsize=None)
+def club_players_batch(size):
+    # Aliased document for `size` clubs: alias c<i> reads variable $slug<i>
+    variables = ", ".join(f"$slug{i}: String!" for i in range(size))
+    fields = "\n".join(f"c{i}: club(slug: $slug{i}) {{" + club_selection + "}" for i in range(size))
+    return gql(f"query ClubPlayersBatch({variables}) {{ football {{ {fields} }} }}")
+
+
+def schema_file():
+    # data/schema-<endpoint hash>.graphql: a stand-in server's schema never replaces the real one
+    return os.path.join(schema_folder, f"schema-{hashlib.sha256(url.encode()).hexdigest()[:12]}.graphql")
+
+
+def load_cached_schema():
+    schema_path = schema_file()
+    if not os.path.exists(schema_path):
+        return None
+    with open(schema_path, "r") as file:
+        return build_schema(file.read())
+
+
+def save_schema(schema, introspection_bytes):
+    schema_path = schema_file()
+    os.makedirs(os.path.dirname(schema_path), exist_ok=True)
+    with open(schema_path, "w") as file:
+        file.write(print_schema(schema))
+    # Remember what the introspection cost, to report what the cache saves on later runs
+    with open(schema_path + ".json", "w") as file:
+        json.dump({"introspection_bytes": introspection_bytes}, file)
+
+
+def cached_introspection_bytes():
+    schema_path = schema_file()
+    if not os.path.exists(schema_path + ".json"):
+        return 0
+    with open(schema_path + ".json", "r") as file:
+        return json.load(file)["introspection_bytes"]
+
+
+class SorareClient:
+    # One pooled connection and one session for a whole run:
+    #
+    #     async with SorareClient() as client:
+    #         data = await client.execute(PLAYER_SCORES, {"slug": slug, "after": None})
+    #
+    # legacy_introspection marks scripts that used to introspect the schema before every
+    # request, so the report counts each request as one introspection saved.
+    # Responses go through response_cache unless cache=False; offline (default: SORARE_OFFLINE)
+    # answers only from the cache and raises response_cache.CacheMiss for anything else.
+
+    def __init__(self, max_in_flight=8, legacy_introspection=False, cache=True, offline=None):
+        self.max_in_flight = max_in_flight
+        self.legacy_introspection = legacy_introspection
+        self.cache = cache
+        self.offline = response_cache.offline if offline is None else offline
+        self.stats = {
+            "requests": 0,
+            "queries": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "introspections_saved": 0,
+            "cache_hits": 0,
+        }
+        self.scheduler = RequestScheduler()
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self.offline:
+            self.client = None
+            return self
+
+        # Count the real bytes on the wire
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_chunk_sent.append(self._on_request_chunk_sent)
+        trace_config.on_response_chunk_received.append(self._on_response_chunk_received)
+
+        transport = AIOHTTPTransport(
+            url=url,
+            headers={"APIKEY": os.getenv("SORARE_API_KEY")} if os.getenv("SORARE_API_KEY") else {},
+            client_session_args={
+                "connector": aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=60),
+                "trace_configs": [trace_config],
+            },
+        )
+
+        schema = load_cached_schema()
+        self.client = Client(transport=transport, schema=schema)
+        self.session = await self.client.connect_async()
+
+        if schema is None:
+            # First run against this endpoint: the introspection waits for the rate limiter and
+            # is retried like any other request
+            try:
+                introspection = await self.send(gql(get_introspection_query()))
+            except BaseException:
+                await self.client.close_async()
+                raise
+            self.client.schema = build_client_schema(introspection)
+            save_schema(self.client.schema, self.stats["bytes_sent"] + self.stats["bytes_received"])
+        else:
+            self.stats["introspections_saved"] += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.client is not None:
+            await self.client.close_async()
+        self.report()
+
+    async def _on_request_chunk_sent(self, session, context, params):
+        self.stats["bytes_sent"] += len(params.chunk)
+
+    async def _on_response_chunk_received(self, session, context, params):
+        self.stats["bytes_received"] += len(params.chunk)
+
+    async def execute(self, document, variables=None, queries=1):
+        # `queries` is how many single-entity requests this one replaces (one per alias)
+        if self.cache or self.offline:
+            result = response_cache.load_response(url, document, variables, max_age=float("inf") if self.offline else None)
+            if result is not None:
+                self.stats["cache_hits"] += 1
+                return result
+            if self.offline:
+                raise response_cache.CacheMiss(f"{document.definitions[0].name.value} {variables} is not cached")
+
+        result = await self.send(document, variables, queries)
+        if self.cache:
+            response_cache.save_response(url, document, variables, result)
+
+        self.stats["requests"] += 1
+        self.stats["queries"] += queries
+        if self.legacy_introspection:
+            self.stats["introspections_saved"] += 1
+        return result
+
+    async def send(self, document, variables=None, queries=1):
+        # Every request waits for the rate limiter; transient failures are retried with backoff,
+        # without holding an in-flight slot while waiting
+        attempt = 0
+        while True:
+            await self.scheduler.acquire()
+            try:
+                async with self.semaphore:
+                    sent = time.perf_counter()
+                    result = await self.session.execute(document, variable_values=variables)
+                    instrumentation.record_request(time.perf_counter() - sent, queries)
+                self.scheduler.on_success()
+                return result
+            except Exception as error:
+                delay = self.scheduler.on_error(error, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                print(f"Request failed ({error!r}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def report(self):
+        stats = self.stats
+        instrumentation.record_api_stats({
+            "bytes_sent": stats["bytes_sent"],
+            "bytes_received": stats["bytes_received"],
+            "cache_hits": stats["cache_hits"],
+            **self.scheduler.stats,
+        })
+        batching_saved = stats["queries"] - stats["requests"]
+        requests_saved = batching_saved + stats["introspections_saved"] + stats["cache_hits"]
+        bytes_saved = stats["introspections_saved"] * cached_introspection_bytes()
+        print(
+            f"API: {stats['requests']} requests, {stats['bytes_sent']} bytes sent, "
+            f"{stats['bytes_received']} bytes received, {stats['cache_hits']} served from the cache"
+        )
+        print(
+            f"API: saved {requests_saved} requests ({batching_saved} by batching, "
+            f"{stats['introspections_saved']} schema introspections) and about {bytes_saved} bytes"
+        )
+        print(
+            f"API: {self.scheduler.stats['retries']} retries, {self.scheduler.stats['throttled']} rate-limit responses, "
+            f"ending at {self.scheduler.rate:.1f} requests per second"
+        )
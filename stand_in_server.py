@@ -0,0 +1,179 @@
+import asyncio
+import datetime
+import hashlib
+import random
+import sys
+import time
+from aiohttp import web
+from graphql import build_schema, graphql
+
+# Local stand-in for the Sorare API with the fields the downloaders use and synthetic data:
+#
+#     python stand_in_server.py [port]
+#     SORARE_API_URL=http://localhost:8765/graphql python dl_so5.py
+#
+# Every club has players_per_club players (or its count in club_sizes), every player
+# scores_per_player scores, one game a week going back from last_game. The same slug always
+# gets the same scores.
+players_per_club = 25
+club_sizes = {}
+scores_per_player = 120
+last_game = datetime.datetime(2024, 2, 18, 20, 0)
+port = 8765
+
+# Requests per second served before answering 429 with a Retry-After (None = unlimited),
+# and the share of requests failing with a 503, to exercise the client's scheduler
+rate_limit = None
+failure_rate = 0.0
+
+# Simulated server time: seconds per request plus seconds per aliased player or club in it
+latency = 0.0
+latency_per_alias = 0.0
+
+schema = build_schema("""
+type Query {
+    football: Football
+    user(slug: String!): User
+}
+type Football {
+    player(slug: String!): Player
+    club(slug: String!): Club
+    allCards(first: Int, after: String): CardConnection!
+}
+type User {
+    footballCards(first: Int, after: String): CardConnection!
+}
+type Club {
+    activePlayers: PlayerConnection!
+}
+type Player {
+    slug: String!
+    displayName: String!
+    position: String
+    so5Scores(last: Int): [So5Score!]!
+    allSo5Scores(first: Int, after: String): So5ScoreConnection!
+}
+type So5Score {
+    score: Float!
+    game: Game!
+}
+type Game {
+    date: String!
+}
+type Card {
+    player: Player
+}
+type PageInfo {
+    endCursor: String
+    hasNextPage: Boolean!
+}
+type PlayerConnection {
+    nodes: [Player!]!
+}
+type So5ScoreConnection {
+    nodes: [So5Score!]!
+    pageInfo: PageInfo!
+}
+type CardConnection {
+    nodes: [Card!]!
+    pageInfo: PageInfo!
+}
+""")
+
+positions = ["Goalkeeper", "Defender", "Midfielder", "Forward"]
+
+
+def page(items, first, after, key=None):
+    # Cursor pagination over a list. The cursor is the key of the last item returned (by
+    # default its position), so like the real API's cursors, items added at the head do not
+    # shift the pages after a cursor.
+    keys = [key(item) for item in items] if key else [str(i + 1) for i in range(len(items))]
+    start = keys.index(after) + 1 if after else 0
+    end = min(start + (first or 50), len(items))
+    return {"nodes": items[start:end], "pageInfo": {"endCursor": keys[end - 1] if end else None, "hasNextPage": end < len(items)}}
+
+
+def player_scores(slug):
+    seed = int(hashlib.sha256(slug.encode()).hexdigest()[:8], 16)
+    scores = []
+    for i in range(scores_per_player):
+        seed = (seed * 1103515245 + 12345) % 2 ** 31
+        # About one game in six is a zero (did not play)
+        score = 0.0 if seed % 6 == 0 else round(seed % 9000 / 100, 1)
+        date = last_game - datetime.timedelta(weeks=i)
+        scores.append({"score": score, "game": {"date": date.strftime("%Y-%m-%dT%H:%M:%SZ")}})
+    return scores
+
+
+class Player:
+    def __init__(self, slug):
+        self.slug = slug
+        self.displayName = slug.replace("-", " ").title()
+        self.position = positions[int(hashlib.sha256(slug.encode()).hexdigest()[:2], 16) % len(positions)]
+
+    def so5Scores(self, info, last=15):
+        return player_scores(self.slug)[:last]
+
+    def allSo5Scores(self, info, first=50, after=None):
+        return page(player_scores(self.slug), first, after, key=lambda score: score["game"]["date"])
+
+
+class Football:
+    def player(self, info, slug):
+        return Player(slug)
+
+    def club(self, info, slug):
+        return {"activePlayers": {"nodes": [Player(f"{slug}-player-{i}") for i in range(club_sizes.get(slug, players_per_club))]}}
+
+    def allCards(self, info, first=100, after=None):
+        # Three cards per player, like several rarities of the same player
+        return page([{"player": Player(f"player-{i // 3}")} for i in range(3000)], first, after)
+
+
+class Root:
+    football = Football()
+
+    def user(self, info, slug):
+        cards = [{"player": Player(f"{slug}-player-{i}")} for i in range(40)]
+        return {"footballCards": lambda info, first=50, after=None: page(cards, first, after)}
+
+
+def make_app():
+    app = web.Application()
+    app["stats"] = {"requests": 0, "throttled": 0, "failed": 0}
+    window = []
+
+    async def handle(request):
+        app["stats"]["requests"] += 1
+        now = time.monotonic()
+        window[:] = [t for t in window if now - t < 1] + [now]
+        if rate_limit is not None and len(window) > rate_limit:
+            app["stats"]["throttled"] += 1
+            raise web.HTTPTooManyRequests(headers={"Retry-After": "1"})
+        if random.random() < failure_rate:
+            app["stats"]["failed"] += 1
+            raise web.HTTPServiceUnavailable()
+
+        body = await request.json()
+        result = await graphql(schema, body["query"], Root(), variable_values=body.get("variables"), operation_name=body.get("operationName"))
+        if latency or latency_per_alias:
+            aliases = len((result.data or {}).get("football") or {})
+            await asyncio.sleep(latency + latency_per_alias * aliases)
+        response = {"data": result.data}
+        if result.errors:
+            response["errors"] = [{"message": error.message} for error in result.errors]
+        return web.json_response(response)
+
+    app.router.add_post("/graphql", handle)
+    return app
+
+
+if __name__ == "__main__":
+    # python stand_in_server.py [port [rate_limit [failure_rate]]]
+    if len(sys.argv) > 1:
+        port = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        rate_limit = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        failure_rate = float(sys.argv[3])
+    web.run_app(make_app(), port=port)
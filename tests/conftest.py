@@ -0,0 +1,23 @@
+import os
+import socket
+import sys
+import pytest
+
+# The modules are top-level scripts of the repository folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sorare_client
+import stand_in_server
+
+
+@pytest.fixture
+def port(tmp_path, monkeypatch):
+    # Free port for a stand-in server, the client pointed at it, cache and schema under a
+    # temporary folder
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        free_port = probe.getsockname()[1]
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sorare_client, "url", f"http://127.0.0.1:{free_port}/graphql")
+    monkeypatch.setattr(stand_in_server, "scores_per_player", 120)
+    return free_port
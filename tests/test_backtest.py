@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import backtest
+from panel import ScorePanel
+
+
+def last_value_forecaster(series_ids, history):
+    # Forecasts each series' latest score, bounds 5 points around it
+    last = history[:, -1]
+    return last, last - 5, last + 5
+
+
+def make_panel():
+    # "a": 14 scores 1..14, "b": 12 scores 101..112, right-aligned
+    values = np.full((2, 14), np.nan, dtype=np.float32)
+    values[0] = np.arange(1, 15)
+    values[1, 2:] = np.arange(101, 113)
+    return ScorePanel(["a", "b"], values, np.array([14, 12], dtype=np.int32), "2024-02-19")
+
+
+def test_origins_replay_past_scores(monkeypatch):
+    monkeypatch.setattr(backtest, "origins", 4)
+    monkeypatch.setattr(backtest, "min_history", 10)
+    series_ids, actual, forecast, lower, upper = backtest.run_backtest(make_panel(), last_value_forecaster)
+
+    assert list(series_ids) == ["a", "b"]
+    # Origin k: the k-th latest score, forecast from the one before it
+    assert actual[:, 0].tolist() == [14, 13, 12, 11]
+    assert forecast[:, 0].tolist() == [13, 12, 11, 10]
+    # "b" only has 10 scores before its 2nd latest one, and fewer after that
+    assert actual[:2, 1].tolist() == [112, 111] and np.isnan(actual[2:, 1]).all()
+    assert np.isnan(forecast[2:, 1]).all()
+    assert (upper - lower)[~np.isnan(forecast)].tolist() == [10] * 6
+
+
+def test_scores():
+    actual = np.array([[10.0, 20.0], [30.0, np.nan]], dtype=np.float32)
+    summary, by_class = backtest.score_backtest(actual, actual, actual - 1, actual + 1)
+    assert summary["Forecasts"] == 3
+    assert summary["SMAPE"] == 0 and summary["Deviation"] == 0 and summary["Bias"] == 0
+    assert summary["Within Bounds"] == 100 and summary["Bound Width"] == 2
+    assert by_class["Count"].sum() == 3 and by_class.loc["10-20", "Count"] == 1
+
+    summary, _ = backtest.score_backtest(actual, actual + 10, actual, actual + 20)
+    assert summary["Bias"] == pytest.approx(10) and summary["Within Bounds"] == 100
@@ -0,0 +1,82 @@
+import asyncio
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+from batch_queries import failed_aliases, fetch_clubs_batched, fetch_scores_batched
+
+
+def scores_page(dates, end_cursor=None):
+    return {
+        "allSo5Scores": {
+            "nodes": [{"score": 50.0, "game": {"date": date}} for date in dates],
+            "pageInfo": {"hasNextPage": end_cursor is not None, "endCursor": end_cursor},
+        }
+    }
+
+
+def fake_execute(pages, bad=(), partial=()):
+    # pages: {(slug, cursor): page}. Slugs in bad come back null with an error, slugs in partial
+    # with their page but an error under their alias; any error makes gql raise with the data.
+    async def execute(document, variables, queries=1):
+        prefix = "p" if any(name.startswith("after") for name in variables) else "c"
+        data, errors = {"football": {}}, []
+        for name, slug in variables.items():
+            if not name.startswith("slug"):
+                continue
+            alias = prefix + name[len("slug"):]
+            if slug in bad:
+                data["football"][alias] = None
+                errors.append({"message": f"{slug} not found", "path": ["football", alias]})
+                continue
+            data["football"][alias] = pages[slug, variables.get("after" + name[len("slug"):])]
+            if slug in partial:
+                errors.append({"message": "failed", "path": ["football", alias, "allSo5Scores"]})
+        if errors:
+            raise TransportQueryError(errors[0]["message"], errors=errors, data=data)
+        return data
+
+    return execute
+
+
+async def collect(execute, slugs, size=None):
+    return {slug: scores async for slug, scores in fetch_scores_batched(execute, slugs, size=size)}
+
+
+def test_failed_aliases():
+    data = {"football": {"p0": {"x": 1}, "p1": None, "p2": {"x": 2}, "p3": {"x": 3}}}
+    error = TransportQueryError(
+        "errors",
+        errors=[
+            {"message": "null", "path": ["football", "p1"]},
+            {"message": "field", "path": ["football", "p2", "allSo5Scores", "nodes", 0]},
+            {"message": "no path"},
+        ],
+        data=data,
+    )
+    assert failed_aliases(error, data) == {"p1", "p2"}
+
+
+def test_only_failed_players_are_dropped():
+    pages = {
+        ("a", None): scores_page(["2024-02-18T20:00:00Z", "2024-02-11T20:00:00Z"], "2"),
+        ("a", "2"): scores_page(["2024-02-04T20:00:00Z"]),
+        ("b", None): scores_page(["2024-02-18T20:00:00Z"]),
+        ("c", None): scores_page(["2024-02-18T20:00:00Z"]),
+    }
+    scores = asyncio.run(collect(fake_execute(pages, bad={"bad"}, partial={"c"}), ["a", "bad", "b", "c"]))
+    assert scores["bad"] is None and scores["c"] is None
+    assert [node["game"]["date"][:10] for node in scores["a"]] == ["2024-02-18", "2024-02-11", "2024-02-04"]
+    assert len(scores["b"]) == 1
+
+
+def test_failed_request_drops_its_window():
+    async def execute(document, variables, queries=1):
+        raise TransportServerError("503", 503)
+
+    scores = asyncio.run(collect(execute, ["a", "b", "c"], size=2))
+    assert scores == {"a": None, "b": None, "c": None}
+
+
+def test_bad_club_gets_a_null_club():
+    pages = {("good", None): {"activePlayers": {"nodes": [{"slug": "p"}]}}}
+    clubs = asyncio.run(fetch_clubs_batched(fake_execute(pages, bad={"bad"}), ["good", "bad"]))
+    assert clubs["bad"] == {"football": {"club": None}}
+    assert clubs["good"]["football"]["club"]["activePlayers"]["nodes"] == [{"slug": "p"}]
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from change_tracking import merge_predictions, reusable_forecasts, series_hashes
+from forecast_history import append_forecasts
+from panel import ScorePanel
+
+
+def make_panel(scores):
+    # {slug: scores, oldest first}
+    width = max(len(values) for values in scores.values())
+    values = np.full((len(scores), width), np.nan, dtype=np.float32)
+    for i, series in enumerate(scores.values()):
+        values[i, width - len(series):] = series
+    lengths = np.array([len(series) for series in scores.values()], dtype=np.int32)
+    return ScorePanel(list(scores), values, lengths, "2024-02-19")
+
+
+def prediction(expected):
+    # One step of forecasts for {slug: expected score}
+    forecast = pd.DataFrame([expected], index=pd.Index([1], name="Step"))
+    return SimpleNamespace(forecast=forecast, lower_forecast=forecast - 10, upper_forecast=forecast + 10)
+
+
+def test_series_hashes_change_with_the_scores():
+    before = series_hashes(make_panel({"a": [1, 2, 3], "b": [4, 5]}))
+    after = series_hashes(make_panel({"a": [1, 2, 3], "b": [4, 5, 6], "c": [7]}))
+    assert before["a"] == after["a"] and before["b"] != after["b"]
+    # Padding of a wider panel does not change a series' hash
+    assert series_hashes(make_panel({"a": [1, 2, 3]}))["a"] == before["a"]
+
+
+def test_reuse_skips_other_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "tmpl.csv").write_text("model")
+    (tmp_path / "other.csv").write_text("other model")
+    hashes = series_hashes(make_panel({"a": [1, 2, 3], "b": [4, 5], "c": [6, 7]}))
+
+    append_forecasts(prediction({"a": 50.0, "b": 40.0, "c": 30.0}), "l1", "tmpl.csv", hashes)
+    # Later runs without hashes or with another template do not hide it
+    append_forecasts(prediction({"a": 1.0, "b": 1.0, "c": 1.0}), "l1", "baseline")
+    append_forecasts(prediction({"a": 2.0}), "l1", "other.csv", hashes)
+
+    # "b" got a new score since
+    hashes["b"] = "changed"
+    reused = reusable_forecasts("l1", hashes, "tmpl.csv", [1])
+    assert reused.set_index("slug")["expected"].to_dict() == {"a": 50.0, "c": 30.0}
+    assert reusable_forecasts("l1", hashes, "tmpl.csv", [1, 2]).empty
+
+    # The newest matching forecast wins
+    append_forecasts(prediction({"a": 55.0}), "l1", "tmpl.csv", hashes)
+    assert reusable_forecasts("l1", hashes, "tmpl.csv", [1]).set_index("slug")["expected"].to_dict() == {"a": 55.0, "c": 30.0}
+
+
+def test_merge_predictions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "tmpl.csv").write_text("model")
+    hashes = series_hashes(make_panel({"a": [1, 2], "b": [3, 4]}))
+    append_forecasts(prediction({"a": 50.0, "b": 40.0}), "l1", "tmpl.csv", hashes)
+    reused = reusable_forecasts("l1", hashes, "tmpl.csv", [1]).query("slug == 'a'")
+
+    new = prediction({"b": 45.0})
+    new.forecast.index = new.lower_forecast.index = new.upper_forecast.index = pd.DatetimeIndex(["2024-02-20"])
+    merged = merge_predictions(new, reused, "tmpl.csv", "2024-02-20", 1)
+    assert merged.forecast.iloc[0].to_dict() == {"a": 50.0, "b": 45.0}
+    assert merged.lower_forecast.iloc[0].to_dict() == {"a": 40.0, "b": 35.0}
+    assert merged.template["b"] == "tmpl.csv" and merged.template["a"].startswith("tmpl-")
+
+    # Nothing changed: the reused rows alone
+    merged = merge_predictions(None, reused, "tmpl.csv", "2024-02-20", 1)
+    assert merged.forecast.index[0] == pd.Timestamp("2024-02-20") and merged.forecast.iloc[0].to_dict() == {"a": 50.0}
@@ -0,0 +1,67 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from lineup import best_lineups, disjoint_lineups, player_values, slots
+from rosters import positions
+
+
+def random_players(seed, per_position=6):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        [
+            {"slug": f"{position.lower()}-{i}", "position": position, "value": float(rng.integers(0, 80)), "cards": 1}
+            for position in positions
+            for i in range(per_position)
+        ]
+    )
+
+
+def brute_force_totals(players, n):
+    # Every set of one player per position plus an extra outfield player
+    by_position = {position: group for position, group in players.groupby("position")}
+    outfield = players[players["position"] != "Goalkeeper"]
+    lineups = {}
+    for picks in itertools.product(*(by_position[position].itertuples() for position in positions)):
+        for extra in outfield.itertuples():
+            if extra.slug not in {pick.slug for pick in picks}:
+                lineup = frozenset([pick.slug for pick in picks] + [extra.slug])
+                lineups[lineup] = sum(pick.value for pick in picks) + extra.value
+    return sorted(lineups.values(), reverse=True)[:n]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_best_lineups_match_brute_force(seed):
+    players = random_players(seed)
+    lineups = best_lineups(players, 10)
+    assert lineups["Total"].tolist() == brute_force_totals(players, 10)
+
+    value_of = players.set_index("slug")["value"]
+    position_of = players.set_index("slug")["position"]
+    for _, lineup in lineups.iterrows():
+        assert len(set(lineup[slots])) == len(slots)
+        assert all(position_of[lineup[position]] == position for position in positions)
+        assert position_of[lineup["Extra"]] != "Goalkeeper"
+        assert value_of[list(lineup[slots])].sum() == lineup["Total"]
+
+
+def test_missing_position_raises():
+    players = random_players(0)
+    with pytest.raises(ValueError):
+        best_lineups(players[players["position"] != "Goalkeeper"], 10)
+
+
+def test_disjoint_lineups_use_each_card_once():
+    lineups = disjoint_lineups(random_players(1), 3)
+    assert len(lineups) == 3
+    used = lineups[slots].to_numpy().ravel()
+    assert len(set(used)) == len(used)
+    assert lineups["Total"].is_monotonic_decreasing
+
+
+def test_player_values_keep_owned_cards():
+    forecasts = pd.DataFrame({"slug": ["a", "b", "c"], "expected": [50.0, 40.0, 30.0], "lower": [40.0, 30.0, 20.0], "upper": [60.0, 70.0, 40.0]})
+    roster = pd.DataFrame({"slug": ["a", "b", "c"], "position": ["Forward", "Defender", "Goalkeeper"]})
+    players = player_values(forecasts, roster, {"expected": 0.5, "upper": 0.5}, cards=pd.Series({"a": 1, "b": 2}))
+    assert players.set_index("slug")["value"].to_dict() == {"a": 55.0, "b": 55.0}
+    assert players.set_index("slug")["cards"].to_dict() == {"a": 1, "b": 2}
@@ -0,0 +1,69 @@
+import asyncio
+import datetime
+import pytest
+from aiohttp import web
+import response_cache
+import sorare_client
+import stand_in_server
+from batch_queries import fetch_scores_batched
+from sorare_client import SorareClient
+
+slugs = ["club-a-player-0", "club-a-player-1"]
+
+
+def download(port):
+    async def run():
+        runner = web.AppRunner(stand_in_server.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        try:
+            async with SorareClient(offline=False) as client:
+                scores = {slug: data async for slug, data in fetch_scores_batched(client.execute, slugs)}
+                return scores, dict(client.stats)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_ttls():
+    document = sorare_client.player_scores_batch(2)
+    assert response_cache.response_ttl(document, {"slug0": "a", "after0": None, "slug1": "b", "after1": None}) == response_cache.ttl_recent
+    assert response_cache.response_ttl(document, {"slug0": "a", "after0": "x", "slug1": "b", "after1": None}) == response_cache.ttl_recent
+    assert response_cache.response_ttl(document, {"slug0": "a", "after0": "x", "slug1": "b", "after1": "y"}) == response_cache.ttl_history
+    assert response_cache.response_ttl(sorare_client.club_players_batch(1), {"slug0": "c"}) == response_cache.ttl_rosters
+    assert response_cache.ttl_rosters <= response_cache.ttl_recent < response_cache.ttl_history
+
+
+def test_second_run_refetches_only_the_head_page(port, monkeypatch):
+    first, stats = download(port)
+    assert stats["requests"] == 3 and stats["cache_hits"] == 0
+    assert [len(first[slug]) for slug in slugs] == [120, 120]
+
+    # Once the first page has expired, only it goes back to the server
+    monkeypatch.setattr(response_cache, "ttl_recent", 0)
+    second, stats = download(port)
+    assert stats["requests"] == 1 and stats["cache_hits"] == 2
+    assert second == first
+
+
+def test_new_game_is_not_lost(port, monkeypatch):
+    download(port)
+
+    # A game more at the head: the first page ends elsewhere, its later pages are new requests
+    monkeypatch.setattr(stand_in_server, "last_game", stand_in_server.last_game + datetime.timedelta(weeks=1))
+    monkeypatch.setattr(stand_in_server, "scores_per_player", 121)
+    monkeypatch.setattr(response_cache, "ttl_recent", 0)
+    scores, stats = download(port)
+    expected = [score["game"]["date"] for score in stand_in_server.player_scores(slugs[0])]
+    assert stats["cache_hits"] == 0
+    assert [score["game"]["date"] for score in scores[slugs[0]]] == expected
+
+
+def test_offline_cold_cache_raises(port):
+    async def run():
+        async with SorareClient(offline=True) as client:
+            return [item async for item in fetch_scores_batched(client.execute, slugs)]
+
+    with pytest.raises(response_cache.CacheMiss):
+        asyncio.run(run())
@@ -0,0 +1,54 @@
+import asyncio
+import aiohttp
+import pytest
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+import scheduler
+from scheduler import RequestScheduler, classify, retry_after
+
+
+def with_headers(error, headers):
+    # What gql raises from an aiohttp response: the HTTP error is the cause
+    error.__cause__ = aiohttp.ClientResponseError(None, (), status=error.code, headers=headers)
+    return error
+
+
+@pytest.mark.parametrize(
+    "error, kind",
+    [
+        (TransportServerError("Too Many Requests", 429), "throttled"),
+        (TransportServerError("Service Unavailable", 503), "retry"),
+        (TransportServerError("Bad Gateway", 502), "retry"),
+        (TransportServerError("Bad Request", 400), None),
+        (TransportQueryError("Rate limit exceeded"), "throttled"),
+        (TransportQueryError("Too many requests, slow down"), "throttled"),
+        (TransportQueryError("Player not found"), None),
+        (aiohttp.ClientConnectionError(), "retry"),
+        (asyncio.TimeoutError(), "retry"),
+        (ValueError("bug"), None),
+    ],
+)
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_retry_after():
+    assert retry_after(with_headers(TransportServerError("429", 429), {"Retry-After": "3"})) == 3.0
+    assert retry_after(with_headers(TransportServerError("429", 429), {"Retry-After": "soon"})) is None
+    assert retry_after(with_headers(TransportServerError("429", 429), {})) is None
+    assert retry_after(TransportServerError("429", 429)) is None
+
+
+def test_on_error(monkeypatch):
+    monkeypatch.setattr(scheduler, "max_retries", 2)
+    limiter = RequestScheduler(rate=8.0)
+
+    assert limiter.on_error(ValueError("bug"), 0) is None
+    assert 0 <= limiter.on_error(TransportServerError("503", 503), 0) <= scheduler.backoff_base
+    assert limiter.rate == 8.0
+
+    # A rate-limit response halves the rate and waits at least the server's delay
+    throttled = with_headers(TransportServerError("429", 429), {"Retry-After": "30"})
+    assert limiter.on_error(throttled, 1) >= 30
+    assert limiter.rate == 8.0 * scheduler.rate_decrease and limiter.tokens == 0
+    assert limiter.on_error(throttled, 2) is None
+    assert limiter.stats == {"retries": 2, "throttled": 1}
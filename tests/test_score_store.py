@@ -0,0 +1,18 @@
+import pandas as pd
+import score_store
+
+
+def scores(value):
+    return pd.DataFrame({"slug": ["a", "a"], "datetime": ["2024-01-07 20:00:00", "2024-01-14 20:00:00"], "score": [40.0, value]})
+
+
+def test_newest_part_wins(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    score_store.write_scores("l1", scores(50.0))
+    # Enough corrections that a random part order would get one of them wrong
+    for value in range(51, 71):
+        score_store.write_scores("l1", scores(float(value)))
+        assert score_store.load_scores("l1")["score"].tolist() == [40.0, value]
+    score_store.compact("l1")
+    assert len(score_store.part_files(["l1"])) == 1
+    assert score_store.load_scores("l1")["score"].tolist() == [40.0, 70.0]
@@ -0,0 +1,32 @@
+import asyncio
+import os
+from types import SimpleNamespace
+from aiohttp import web
+import scheduler
+import sorare_client
+import stand_in_server
+from sorare_client import SorareClient
+
+
+def test_introspection_is_retried(port, monkeypatch):
+    # The first request of a cold run (the introspection) fails with a 503, then everything works
+    draws = iter([0.0] + [1.0] * 100)
+    monkeypatch.setattr(stand_in_server, "failure_rate", 0.5)
+    monkeypatch.setattr(stand_in_server, "random", SimpleNamespace(random=lambda: next(draws)))
+    monkeypatch.setattr(scheduler, "backoff_base", 0.01)
+
+    async def run():
+        runner = web.AppRunner(stand_in_server.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        try:
+            async with SorareClient(cache=False, offline=False) as client:
+                data = await client.execute(sorare_client.player_scores_batch(1), {"slug0": "a", "after0": None})
+                return data, dict(client.scheduler.stats)
+        finally:
+            await runner.cleanup()
+
+    data, stats = asyncio.run(run())
+    assert stats["retries"] == 1
+    assert len(data["football"]["p0"]["allSo5Scores"]["nodes"]) == 50
+    assert os.path.exists(sorare_client.schema_file())
@@ -0,0 +1,36 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from weight_search import rank, search_weights, simplex_points, top_precision
+
+
+@pytest.mark.parametrize("n_features, step", [(2, 0.5), (3, 0.25), (5, 0.1), (9, 0.05)])
+def test_simplex_points_cover_the_simplex(n_features, step):
+    points, units = simplex_points(n_features, step)
+    # Compositions of units into n_features non-negative parts
+    assert len(points) == math.comb(units + n_features - 1, n_features - 1)
+    assert (points.sum(axis=1) == units).all() and (points >= 0).all()
+    assert len(np.unique(points, axis=0)) == len(points)
+
+
+def test_step_must_divide_one():
+    with pytest.raises(ValueError):
+        simplex_points(3, 0.3)
+
+
+def test_top_precision():
+    X = np.array([[5.0, 0.0], [4.0, 1.0], [3.0, 2.0], [2.0, 3.0]], dtype=np.float32)
+    y = np.array([5.0, 4.0, 3.0, 2.0], dtype=np.float32)
+    weights = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    assert top_precision(X, y, weights, top_n=2).tolist() == [1.0, 0.0]
+
+
+def test_search_finds_the_informative_feature():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"noise": rng.random(100), "signal": rng.random(100), "other": rng.random(100)})
+    df["Last Score"] = df["signal"] * 100
+    weights, precision, candidates = search_weights(df, ["noise", "signal", "other"], step=0.25, top_n=5)
+    assert weights == {"noise": 0.0, "signal": 1.0, "other": 0.0}
+    assert precision == 1.0 and len(candidates) == math.comb(6, 2)
+    assert rank(df, weights).index[0] == df["signal"].idxmax()
@@ -1,135 +1,141 @@
 import os
 import pandas as pd
-import datetime
+from types import SimpleNamespace
 from autots import AutoTS
-
-start_time = datetime.datetime.now()
-data_main_folder = "./data/"
-
-dfs = []
-existing_series_ids = set()  # Initialize a set to keep track of processed series_ids
-
-# Iterate over all directories within the main data folder
-for league in os.listdir(data_main_folder):
-    league_folder = os.path.join(data_main_folder, league)
-    if os.path.isdir(league_folder):  # Check if it's a directory
-        print(f"Processing {league}...")
-        for filename in os.listdir(league_folder):
-            # Check if the file is a CSV
-            if filename.endswith(".csv"):
-                # Extract the series_id from the filename
-                series_id = filename.split(".")[0]
-
-                # Skip the file if series_id is already processed
-                if series_id in existing_series_ids:
-                    print(f"Skipping {filename} as its series_id '{series_id}' is already processed.")
-                    continue
-                
-                # Load the CSV file
-                df = pd.read_csv(os.path.join(league_folder, filename), parse_dates=["datetime"])
-
-                # Rename 'score' column to 'value'
-                df.rename(columns={"score": "value"}, inplace=True)
-
-                # Filter out rows where 'value' is 0
-                df = df[df["value"] != 0]
-
-                # Assign series_id
-                df["series_id"] = series_id
-
-                # Calculate the number of rows for the date range
-                number_of_rows = len(df)
-                if number_of_rows < 40:
-                    continue
-
-                # Create a date range ending today, one day per row, going backwards
-                end_date = pd.to_datetime("2024-02-19")
-                start_date = end_date - pd.Timedelta(days=number_of_rows - 1)
-                date_range = pd.date_range(start_date, periods=number_of_rows, freq="D")
-
-                # Assign this date range to the datetime column of the DataFrame, in reverse order
-                df["datetime"] = date_range
-
-                # Append the DataFrame to the list and add series_id to the set of processed ids
-                dfs.append(df)
-                existing_series_ids.add(series_id)
-
-# Concatenate all DataFrames in the list into a single DataFrame
-final_df = pd.concat(dfs, ignore_index=True)
-
-model = AutoTS(
-    forecast_length=1,
-    frequency="D",
-    ensemble="all",
-    max_generations=7,
-    num_validations=10,
-    no_negatives=True,
-    constraint=2.0,
-    introduce_na=False,
-    model_list=['ARCH', 'ARDL', 'ARIMA', 'AverageValueNaive', 'ConstantNaive',
-       'DatepartRegression', 'ETS', 'FBProphet', 'GLM', 'GLS',
-       'LastValueNaive', 'MetricMotif', 'MultivariateMotif',
-       'MultivariateRegression', 'NVAR', 'SeasonalNaive',
-       'SeasonalityMotif', 'SectionalMotif', 'Theta', 'UnivariateMotif',
-       'UnivariateRegression', 'UnobservedComponents', 'VECM',
-       'WindowRegression']
-    # model_list=["NeuralForecast"]
-)
-
-model = model.fit(
-    final_df,
-    date_col="datetime",
-    value_col="value",
-    id_col="series_id",
-)
-
-os.makedirs("models", exist_ok=True)
-model.export_template(
-    "models/global_model.csv",
-    models="best",
-    max_per_model_class=1,
-    include_results=True,
-)
-
-end_time = datetime.datetime.now()
-
-# Step 3: Calculate the duration
-duration = end_time - start_time
-
-prediction = model.predict()
-forecasts_df = prediction.forecast
-print(forecasts_df)
-# Define the path where you want to save the CSV
-forecasts_csv_path = "./global_forecasts.csv"
-
-# Make sure the directory exists before saving
-os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
-
-# Save the DataFrame to CSV
-forecasts_df.to_csv(forecasts_csv_path, index=False)
-
-
-forecasts_df = prediction.forecast
-upper_forecasts_df = prediction.upper_forecast
-lower_forecasts_df = prediction.lower_forecast
-
-# Rename index to distinguish forecast types
-forecasts_df.index = ['forecast']
-upper_forecasts_df.index = ['upper_forecast']
-lower_forecasts_df.index = ['lower_forecast']
-
-# Concatenate the forecasts vertically
-all_forecasts_df = pd.concat([forecasts_df, upper_forecasts_df, lower_forecasts_df])
-
-# Define the path where you want to save the CSV
-forecasts_csv_path = "./global_forecasts_all.csv"
-
-# Make sure the directory exists before saving
-os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
-
-# Save the DataFrame to CSV
-all_forecasts_df.to_csv(forecasts_csv_path, index_label='Type')
-
-# Confirmation message
-print(f"Forecast CSV saved to {forecasts_csv_path}")
-print(f"Time elapsed: {duration.seconds // 3600} hours, {(duration.seconds // 60) % 60} minutes, {duration.seconds % 60} seconds")
\ No newline at end of file
+import baseline
+import instrumentation
+from instrumentation import stage
+from dataset import load_panel
+from forecasts import save_forecasts, forecast_length
+from rosters import player_positions, positions
+from warm_start import seed_search
+from workers import process_pool
+
+# Search and fit one model per roster position (goalkeepers, defenders, midfielders, forwards),
+# each in its own process, instead of one search over every series
+segmented = False
+
+# Cores shared by the segment processes
+cpu_budget = os.cpu_count()
+
+# Template search: generations of a full search and validation rounds
+generations = 7
+validations = 10
+
+# Start each search from last run's models/<name>_model.csv and its results when it exists,
+# running warm_start_generations instead of a full search
+warm_start = True
+warm_start_generations = 2
+
+# "autots" searches and fits the model(s), "baseline" only writes the fast baseline.py forecasts
+engine = "autots"
+
+# Write the baseline forecasts instead when the AutoTS run fails
+fallback_to_baseline = True
+
+
+def fit_global(wide_df, name="global", n_jobs="auto", search=None):
+    # wide_df: one float32 column per series, as ScorePanel.to_wide gives. search: (generations,
+    # validations), the module settings by default
+    max_generations, num_validations = search or (generations, validations)
+    template_path = f"models/{name}_model.csv"
+    warm = warm_start and os.path.exists(template_path)
+
+    model = AutoTS(
+        forecast_length=forecast_length(),
+        frequency="D",
+        ensemble="all",
+        max_generations=warm_start_generations if warm else max_generations,
+        num_validations=num_validations,
+        no_negatives=True,
+        constraint=2.0,
+        introduce_na=False,
+        n_jobs=n_jobs,
+        model_list=['ARCH', 'ARDL', 'ARIMA', 'AverageValueNaive', 'ConstantNaive',
+           'DatepartRegression', 'ETS', 'FBProphet', 'GLM', 'GLS',
+           'LastValueNaive', 'MetricMotif', 'MultivariateMotif',
+           'MultivariateRegression', 'NVAR', 'SeasonalNaive',
+           'SeasonalityMotif', 'SectionalMotif', 'Theta', 'UnivariateMotif',
+           'UnivariateRegression', 'UnobservedComponents', 'VECM',
+           'WindowRegression']
+        # model_list=["NeuralForecast"]
+    )
+    with stage("fit"):
+        if warm:
+            seed_search(model, template_path)
+        model = model.fit(wide_df)
+
+    with stage("export"):
+        os.makedirs("models", exist_ok=True)
+        model.export_template(
+            template_path,
+            models="best",
+            max_per_model_class=1,
+            include_results=True,
+        )
+    return model
+
+
+def train_segment(segment, segment_df, n_jobs, search):
+    # Runs in a worker process; each segment exports its own template, models/global_<segment>_model.csv
+    # and logs its own run. search comes from the parent, the worker only has the defaults.
+    with instrumentation.run("train_global_segment", segment=segment, series=segment_df.shape[1], n_jobs=n_jobs):
+        model = fit_global(segment_df, f"global_{segment.lower()}", n_jobs, search)
+        with stage("predict"):
+            prediction = model.predict()
+    return prediction.forecast, prediction.upper_forecast, prediction.lower_forecast
+
+
+def train_segmented(panel):
+    # Players missing from the rosters (left the league, gallery-only cards) form their own segment
+    position_of = player_positions()
+    segment_of = pd.Series(panel.slugs).map(position_of).fillna("Unknown").to_numpy()
+    segments = [segment for segment in positions + ["Unknown"] if (segment_of == segment).any()]
+
+    workers = len(segments)
+    n_jobs = max(1, cpu_budget // workers)
+    print(f"Training {workers} segments with {n_jobs} cores each: {', '.join(segments)}")
+
+    with stage("segments"), process_pool(workers, n_jobs) as executor:
+        futures = [
+            executor.submit(train_segment, segment, panel.subset(segment_of == segment).to_wide(), n_jobs, (generations, validations))
+            for segment in segments
+        ]
+        results = [future.result() for future in futures]
+
+    # Merge the segments back into the usual one-column-per-player layout
+    merged = [pd.concat(frames, axis=1).sort_index(axis=1) for frames in zip(*results)]
+    template = pd.Series(segment_of, index=panel.slugs).map(lambda segment: f"models/global_{segment.lower()}_model.csv")
+    return SimpleNamespace(template=template, forecast=merged[0], upper_forecast=merged[1], lower_forecast=merged[2])
+
+
+def train_global():
+    # Scores of every league, filtered and re-dated in one pass (cached until the store changes).
+    # A player present in several leagues is only kept once. The panel is a memory-mapped float32
+    # matrix; AutoTS gets it as a wide frame instead of a long frame with a string id per row.
+    panel = load_panel(min_rows=40)
+
+    if engine == "baseline":
+        with stage("predict"):
+            prediction = baseline.predict_panel(panel)
+    else:
+        try:
+            if segmented:
+                prediction = train_segmented(panel)
+            else:
+                model = fit_global(panel.to_wide())
+                with stage("predict"):
+                    prediction = model.predict()
+        except Exception as error:
+            if not fallback_to_baseline:
+                raise
+            print(f"AutoTS failed ({error!r}), writing baseline forecasts instead")
+            prediction = baseline.predict_panel(panel)
+
+    with stage("export"):
+        save_forecasts(prediction, "global", "models/global_model.csv")
+
+
+if __name__ == "__main__":
+    with instrumentation.run("train_global", segmented=segmented, engine=engine):
+        train_global()
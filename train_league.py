@@ -1,121 +1,109 @@
 import os
-import pandas as pd
-import datetime
+from autots import AutoTS
+import baseline
+import instrumentation
+from instrumentation import stage
+from dataset import load_training_frame
+from forecasts import save_forecasts, forecast_length
+from panel import ScorePanel
+from change_tracking import series_hashes
+from refit import refresh
+from warm_start import seed_search
 
-start_time = datetime.datetime.now()
 league = "ligue-1-fr"
 
-
-# Path to the data folder
-data_folder = "./data/" + league
-
-dfs = []
-for filename in os.listdir(data_folder):
-    # Check if the file is a CSV
-    if filename.endswith(".csv"):
-        # Extract the series_id from the filename
-        series_id = filename.split(".")[0]
-        
-        # Load the CSV file
-        df = pd.read_csv(os.path.join(data_folder, filename), parse_dates=["datetime"])
-        
-        # Rename 'score' column to 'value'
-        df.rename(columns={"score": "value"}, inplace=True)
-        
-        # Filter out rows where 'value' is 0
-        df = df[df["value"] != 0]
-        
-        # Assign series_id
-        df["series_id"] = series_id
-        
-        # Calculate the number of rows for the date range
-        number_of_rows = len(df)
-        if number_of_rows < 20:
-            continue
-        
-        # Create a date range ending today, one day per row, going backwards
-        end_date = pd.to_datetime("2024-02-19")
-        start_date = end_date - pd.Timedelta(days=number_of_rows - 1)
-        date_range = pd.date_range(start_date, periods=number_of_rows, freq="D")
-        
-        # Assign this date range to the datetime column of the DataFrame, in reverse order
-        df["datetime"] = date_range
-        
-        # Append the DataFrame to the list
-        dfs.append(df)
-
-# Concatenate all DataFrames in the list into a single DataFrame
-final_df = pd.concat(dfs, ignore_index=True)
-
-from autots import AutoTS
-
-model = AutoTS(
-    forecast_length=1,
-    frequency="D",
-    ensemble="all",
-    max_generations=10,
-    num_validations=10,
-    no_negatives=True,
-    verbose=0,
-    constraint=2.0,
-    introduce_na=False,
-        # model_list=["NeuralProphet", "NeuralForecast", "PytorchForecasting"]
-)
-
-model = model.fit(
-    final_df,
-    date_col="datetime",
-    value_col="value",
-    id_col="series_id",
-)
-
-os.makedirs("models", exist_ok=True)
-model.export_template(
-    "models/" + league + "_model.csv",
-    models="best",
-    max_per_model_class=1,
-    include_results=True,
-)
-
-end_time = datetime.datetime.now()
-
-# Step 3: Calculate the duration
-duration = end_time - start_time
-
-prediction = model.predict()
-forecasts_df = prediction.forecast
-print(forecasts_df)
-# Define the path where you want to save the CSV
-forecasts_csv_path = f"./{league}_forecasts.csv"
-
-# Make sure the directory exists before saving
-os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
-
-# Save the DataFrame to CSV
-forecasts_df.to_csv(forecasts_csv_path, index=False)
-
-
-forecasts_df = prediction.forecast
-upper_forecasts_df = prediction.upper_forecast
-lower_forecasts_df = prediction.lower_forecast
-
-# Rename index to distinguish forecast types
-forecasts_df.index = ['forecast']
-upper_forecasts_df.index = ['upper_forecast']
-lower_forecasts_df.index = ['lower_forecast']
-
-# Concatenate the forecasts vertically
-all_forecasts_df = pd.concat([forecasts_df, upper_forecasts_df, lower_forecasts_df])
-
-# Define the path where you want to save the CSV
-forecasts_csv_path = f"./{league}_forecasts_all.csv"
-
-# Make sure the directory exists before saving
-os.makedirs(os.path.dirname(forecasts_csv_path), exist_ok=True)
-
-# Save the DataFrame to CSV
-all_forecasts_df.to_csv(forecasts_csv_path, index_label='Type')
-
-# Confirmation message
-print(f"Forecast CSV saved to {forecasts_csv_path}")
-print(f"Time elapsed: {duration.seconds // 3600} hours, {(duration.seconds // 60) % 60} minutes, {duration.seconds % 60} seconds")
\ No newline at end of file
+# Series with fewer scores than this are not used
+min_rows = 20
+
+# Template search: generations of a full search, validation rounds and AutoTS model list
+generations = 10
+validations = 10
+model_list = None  # None: AutoTS's own default
+
+# Start the search from last run's models/<league>_model.csv and its results when it exists,
+# running warm_start_generations instead of a full search
+warm_start = True
+warm_start_generations = 3
+
+# Weekly refresh: when models/<league>_model.csv exists, skip the search and only re-forecast
+# the players whose scores changed with it (refit.refresh)
+refresh_only = False
+
+# "autots" searches and fits a model, "baseline" only writes the fast baseline.py forecasts
+engine = "autots"
+
+# Write the baseline forecasts instead when the AutoTS run fails
+fallback_to_baseline = True
+
+
+def search(league, final_df, n_jobs="auto"):
+    template_path = "models/" + league + "_model.csv"
+    warm = warm_start and os.path.exists(template_path)
+
+    model = AutoTS(
+        forecast_length=forecast_length(),
+        frequency="D",
+        ensemble="all",
+        max_generations=warm_start_generations if warm else generations,
+        num_validations=validations,
+        no_negatives=True,
+        verbose=0,
+        constraint=2.0,
+        introduce_na=False,
+        n_jobs=n_jobs,
+        **({"model_list": model_list} if model_list else {}),
+    )
+    with stage("fit"):
+        if warm:
+            seed_search(model, template_path)
+        model = model.fit(
+            final_df,
+            date_col="datetime",
+            value_col="value",
+            id_col="series_id",
+        )
+
+    with stage("export"):
+        os.makedirs("models", exist_ok=True)
+        model.export_template(
+            template_path,
+            models="best",
+            max_per_model_class=1,
+            include_results=True,
+        )
+    return model
+
+
+def train(league, n_jobs="auto"):
+    template_path = "models/" + league + "_model.csv"
+    with instrumentation.run("train_league", league=league, engine=engine, refresh_only=refresh_only, n_jobs=n_jobs):
+        if engine == "autots" and refresh_only and os.path.exists(template_path):
+            prediction, hashes = refresh(league, template_path, n_jobs)
+            with stage("export"):
+                save_forecasts(prediction, league, template_path, series_hashes=hashes)
+            return
+
+        # Scores of the league, filtered and re-dated in one pass (cached until the store changes)
+        final_df = load_training_frame(league, min_rows=min_rows)
+
+        if engine == "baseline":
+            with stage("predict"):
+                prediction = baseline.predict(final_df)
+        else:
+            try:
+                model = search(league, final_df, n_jobs)
+                with stage("predict"):
+                    prediction = model.predict()
+            except Exception as error:
+                if not fallback_to_baseline:
+                    raise
+                print(f"AutoTS failed for {league} ({error!r}), writing baseline forecasts instead")
+                prediction = baseline.predict(final_df)
+
+        # Hashes of the series searched on, so a later refresh knows which players changed
+        with stage("export"):
+            save_forecasts(prediction, league, template_path, series_hashes=series_hashes(ScorePanel.from_long(final_df)))
+
+
+if __name__ == "__main__":
+    train(league)
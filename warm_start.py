@@ -0,0 +1,26 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+def seed_search(model, template_path):
+    # Seeds an AutoTS search, before fit, with a template exported with include_results=True.
+    # Its models join the first generation and their past results join the pool the genetic
+    # search breeds new candidates from. Returns False when there is no template to start from.
+    if not os.path.exists(template_path):
+        return False
+    model.import_template(template_path, method="addon", enforce_model_list=True)
+
+    results = pd.read_csv(template_path)
+    if "Score" not in results:
+        # Exported without include_results, only the models can be reused
+        return True
+
+    # Ensembles are unpacked by import_template, only their component models are kept
+    results = results[results["Ensemble"] == 0].drop(columns=["index"], errors="ignore")
+    results["Exceptions"] = np.nan
+    results["ValidationRound"] = 0
+    results["TotalRuntime"] = pd.to_timedelta(results["TotalRuntimeSeconds"], unit="s")
+    results["Generation"] = -1
+    model.import_results(results)
+    return True
@@ -0,0 +1,78 @@
+import numpy as np
+
+# Columns of the analysis frame combined into a ranking score
+features = ['Lower Bound', 'Expected Score', 'Upper Bound', 'xscore', 'xscorevalue', 'prob60', 'prob75', 'prob90', 'xdecisive']
+
+# Weights are multiples of step and sum to 1, so 1 / step must be a whole number
+step_size = 0.05
+
+# Precision is measured on the top_n players of each fold
+top_n = 10
+
+# Unshuffled folds, like GridSearchCV(cv=5)
+folds = 5
+
+# Candidate weight vectors scored per matrix multiply
+chunk_size = 20000
+
+
+def simplex_points(n_features, step):
+    # Every weight vector with n_features multiples of step summing to 1, without building the
+    # full product grid: each feature in turn takes every value the remaining budget allows
+    units = round(1 / step)
+    if not np.isclose(units * step, 1):
+        raise ValueError(f"step {step} does not divide 1, try 1 / {units}")
+
+    parts = np.zeros((1, 0), dtype=np.int16)
+    remaining = np.array([units])
+    for _ in range(n_features - 1):
+        counts = remaining + 1
+        parent = np.repeat(np.arange(len(parts)), counts)
+        value = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        parts = np.column_stack([parts[parent], value])
+        remaining = remaining[parent] - value
+    return np.column_stack([parts, remaining]).astype(np.int16), units
+
+
+def min_max_scale(values):
+    low, high = values.min(axis=0), values.max(axis=0)
+    return (values - low) / np.where(high > low, high - low, 1)
+
+
+def top_precision(X, y, weights, top_n=top_n):
+    # Share of the actual top_n rows found in the top_n scores, for every weight vector at once.
+    # One row of scores per weight vector, so the top-k runs along contiguous memory.
+    scores = weights @ X.T
+    predicted_top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    actual_top = np.zeros(len(y), dtype=bool)
+    actual_top[np.argpartition(-y, top_n - 1)[:top_n]] = True
+    return actual_top[predicted_top].sum(axis=1) / top_n
+
+
+def search_weights(df, features=features, target='Last Score', step=step_size, top_n=top_n, folds=folds):
+    # Returns (best weights by feature, best mean precision, every candidate's mean precision)
+    X = min_max_scale(df[features].to_numpy(np.float32))
+    y = df[target].to_numpy(np.float32)
+    points, units = simplex_points(len(features), step)
+    fold_rows = [rows for rows in np.array_split(np.arange(len(df)), folds) if len(rows) >= top_n]
+    if not fold_rows:
+        raise ValueError(f"Every fold has fewer than {top_n} rows")
+
+    precision = np.zeros(len(points), dtype=np.float32)
+    for start in range(0, len(points), chunk_size):
+        weights = points[start:start + chunk_size].astype(np.float32) / units
+        for rows in fold_rows:
+            precision[start:start + chunk_size] += top_precision(X[rows], y[rows], weights, top_n)
+    precision /= len(fold_rows)
+
+    best = int(np.argmax(precision))
+    best_weights = dict(zip(features, (points[best] / units).round(6).tolist()))
+    return best_weights, float(precision[best]), precision
+
+
+def rank(df, weights):
+    # df sorted by the weighted score of its min-max scaled features, score kept in a 'score' column
+    columns = list(weights)
+    ranked = df.copy()
+    ranked['score'] = min_max_scale(df[columns].to_numpy(np.float32)) @ np.array([weights[c] for c in columns], dtype=np.float32)
+    return ranked.sort_values('score', ascending=False)
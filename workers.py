@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Thread pools of the numerical libraries, capped in every worker process
+thread_variables = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]
+
+
+def process_pool(workers, n_jobs):
+    # Spawned worker processes that each keep to n_jobs threads, so the workers share the cores
+    # instead of every one of them using all of them. The libraries read the variables when
+    # they load, in the new process, so setting them here before the workers start is enough.
+    for variable in thread_variables:
+        os.environ[variable] = str(n_jobs)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))